@@ -1,9 +1,29 @@
+import asyncio
+import json
+import os
+import shutil
+import tempfile
 import streamlit as st
 import pandas as pd
 from database import db_manager
 from llm_handler import llm_handler
-from web_search import web_search_fallback
-import plotly.express as px
+from web_search import web_search_fallback, get_web_search
+from pipeline import Pipeline
+from batch import BatchRunner, ResultWriter, read_questions, dedupe
+from chat_history import ChatHistory, purge_stale
+from visualization import create_visualization, show_number
+from config import config
+from metrics import metrics, configure_trace_log
+
+@st.cache_resource
+def get_pipeline():
+    return Pipeline(llm_handler, db_manager, web_search_fallback)
+
+pipeline = get_pipeline()
+
+# Prometheus endpoint and JSON span log; both no-ops after the first run
+metrics.serve(config.METRICS_PORT, config.METRICS_HOST)
+configure_trace_log(config.TRACE_LOG)
 
 # Page configuration
 st.set_page_config(
@@ -12,37 +32,6 @@ st.set_page_config(
     layout="wide"
 )
 
-# Helper function for visualization (moved inline)
-def create_visualization(df, viz_type):
-    """Create visualization based on type"""
-    if df is None or df.empty:
-        st.warning("No data to visualize")
-        return
-    
-    try:
-        if viz_type == 'number':
-            value = df.iloc[0, 0]
-            col1, col2, col3 = st.columns([1, 2, 1])
-            with col2:
-                st.metric(label="Result", value=f"{value:,.0f}" if isinstance(value, (int, float)) else value)
-        
-        elif viz_type == 'bar_chart':
-            if len(df.columns) >= 2:
-                fig = px.bar(df, x=df.columns[0], y=df.columns[1], title="Distribution")
-                st.plotly_chart(fig, use_container_width=True)
-        
-        elif viz_type == 'pie_chart':
-            if len(df.columns) >= 2:
-                fig = px.pie(df, names=df.columns[0], values=df.columns[1], title="Distribution")
-                st.plotly_chart(fig, use_container_width=True)
-        
-        else:
-            st.dataframe(df, use_container_width=True)
-    
-    except Exception as e:
-        st.error(f"Visualization error: {e}")
-        st.dataframe(df, use_container_width=True)
-
 # Title
 st.title("👔 StyleQuery AI")
 st.markdown("### Ask Your Fashion Inventory Anything")
@@ -61,62 +50,168 @@ with st.sidebar:
     """)
     
     if st.button("Clear Chat"):
-        st.session_state.messages = []
+        if "history" in st.session_state:
+            st.session_state.history.clear()
         st.rerun()
+    
+    with st.expander("⚡ SQL Cache"):
+        st.metric("Hit rate", f"{llm_handler.sql_cache.hit_rate():.0%}")
+        st.json(llm_handler.sql_cache.stats)
+        if llm_handler.fast_path:
+            st.caption("Rule-based fast path")
+            st.json(llm_handler.fast_path.stats)
+        if llm_handler.sql_guard:
+            st.caption("SQL guard")
+            st.json(llm_handler.sql_guard.stats)
+    
+    with st.expander("🗄️ DB Pool"):
+        st.json(db_manager.pool_stats())
+    
+    with st.expander("📦 Result Cache"):
+        st.json(db_manager.result_cache.metrics())
+    
+    with st.expander("🌐 Web Search"):
+        st.json(get_web_search().metrics())
 
 # Initialize chat
-if "messages" not in st.session_state:
-    st.session_state.messages = []
+if "history" not in st.session_state:
+    purge_stale(config.HISTORY_DIR)
+    st.session_state.history = ChatHistory(
+        config.HISTORY_DIR,
+        preview_rows=config.HISTORY_PREVIEW_ROWS,
+        max_bytes=int(config.HISTORY_MAX_MB * 1024 * 1024),
+        page_size=config.HISTORY_PAGE_SIZE
+    )
+history = st.session_state.history
 
-# Display chat history
-for message in st.session_state.messages:
-    with st.chat_message(message["role"]):
-        st.markdown(message["content"])
-        if "dataframe" in message:
-            st.dataframe(message["dataframe"], use_container_width=True)
-        if "visualization" in message:
-            create_visualization(message["dataframe"], message["viz_type"])
+def show_past_result(message):
+    """Redraw a stored answer from its preview and cached figure, without re-running anything"""
+    if "rows" not in message:
+        return
+    if message["preview"] is not None and message["preview"].shape == (1, 1):
+        show_number(message["preview"].iloc[0, 0])
+        return
+    if message["figure"]:
+        st.plotly_chart(json.loads(message["figure"]), use_container_width=True, key=f"figure-{message['id']}")
+    shown = 0
+    if message["preview"] is not None:
+        st.dataframe(message["preview"], use_container_width=True)
+        shown = len(message["preview"])
+    if message["rows"] > shown:
+        st.caption(f"{message['rows']:,} rows × {len(message['columns'])} columns")
+        if message["result_path"] and st.button("Load full result", key=f"load-{message['id']}"):
+            st.dataframe(history.load_result(message), use_container_width=True)
 
-# Chat input
-if prompt := st.chat_input("Ask about your inventory..."):
-    st.session_state.messages.append({"role": "user", "content": prompt})
-    with st.chat_message("user"):
-        st.markdown(prompt)
+chat_tab, batch_tab = st.tabs(["💬 Chat", "📋 Batch"])
+
+with chat_tab:
+    # Display chat history; older turns stay collapsed until asked for
+    hidden, visible = history.visible()
+    if hidden and st.button(f"Show {min(hidden, history.page_size)} earlier messages"):
+        history.show_more()
+        st.rerun()
+    for message in visible:
+        with st.chat_message(message["role"]):
+            st.markdown(message["content"])
+            show_past_result(message)
+
+    # Chat input
+    if prompt := st.chat_input("Ask about your inventory..."):
+        history.add_user(prompt)
+        with st.chat_message("user"):
+            st.markdown(prompt)
     
-    with st.chat_message("assistant"):
-        with st.spinner("Thinking..."):
-            sql_query, viz_type = llm_handler.generate_sql(prompt)
+        with st.chat_message("assistant"):
+            with st.spinner("Thinking..."):
+                sql_box = st.container()
+                live_sql = sql_box.empty()
+                preview = st.empty()
             
-            if sql_query:
-                with st.expander("🔍 Generated SQL"):
-                    st.code(sql_query, language="sql")
-                
-                result_df = db_manager.execute_query(sql_query)
-                
-                if result_df is not None and not result_df.empty:
-                    st.success("✅ Query executed!")
-                    st.dataframe(result_df, use_container_width=True)
-                    create_visualization(result_df, viz_type)
+                # SQL as the model writes it, replaced by the final query
+                def show_partial_sql(partial_sql):
+                    live_sql.code(partial_sql, language="sql")
+            
+                def show_sql(sql_query):
+                    live_sql.empty()
+                    with sql_box.expander("🔍 Generated SQL"):
+                        st.code(sql_query, language="sql")
+            
+                # Show the first chunk as soon as it arrives
+                def show_first_chunk(chunk, stream):
+                    if len(stream.chunks) == 1:
+                        preview.dataframe(chunk, use_container_width=True)
+            
+                turn = asyncio.run(pipeline.run(
+                    prompt, on_sql=show_sql, on_chunk=show_first_chunk, on_token=show_partial_sql
+                ))
+                sql_query, viz_type, result_df = turn['sql_query'], turn['viz_type'], turn['result_df']
+            
+                if sql_query:
+                    if result_df is not None and not result_df.empty:
+                        st.success("✅ Query executed!")
+                        preview.dataframe(result_df, use_container_width=True)
+                        if turn['stream'].truncated:
+                            st.info(f"Showing the first {turn['stream'].rows:,} rows; the full result is larger.")
+                        figure = create_visualization(result_df, viz_type)
                     
-                    st.session_state.messages.append({
-                        "role": "assistant",
-                        "content": "✅ Query executed!",
-                        "dataframe": result_df,
-                        "viz_type": viz_type,
-                        "visualization": True
-                    })
+                        history.add_assistant("✅ Query executed!", result_df, viz_type, sql_query, figure)
+                    else:
+                        if turn['error']:
+                            st.error(turn['error'])
+                        st.warning("No results found.")
+                        history.add_assistant("No results found.", sql_query=sql_query)
                 else:
-                    st.warning("No results found.")
-                    st.session_state.messages.append({
-                        "role": "assistant",
-                        "content": "No results found."
-                    })
-            else:
-                st.info("🌐 Searching the web...")
-                web_result = web_search_fallback(prompt)
-                st.markdown(web_result)
+                    live_sql.empty()
+                    # e.g. SQL generation timed out, so the answer comes from the web instead
+                    if turn['error']:
+                        st.error(turn['error'])
+                    st.info("🌐 Searching the web...")
+                    web_result = turn['web_result']
+                    st.markdown(web_result)
+                
+                    history.add_assistant(f"⚠️ {turn['error']}\n\n{web_result}" if turn['error'] else web_result)
+
+with batch_tab:
+    st.write("Upload a CSV (with a `question` column) or JSONL file to answer every question in one run.")
+    uploaded = st.file_uploader("Questions file", type=["csv", "jsonl"])
+    col1, col2 = st.columns(2)
+    with col1:
+        concurrency = st.slider("Parallel questions", 1, 16, config.BATCH_CONCURRENCY)
+    with col2:
+        result_format = st.selectbox("Result format", ["parquet", "csv"])
+    
+    if uploaded is not None and st.button("Run batch"):
+        problems = []
+        questions = dedupe(read_questions(uploaded, uploaded.name, problems))
+        for number, reason in problems:
+            st.warning(f"Line {number} skipped: {reason}")
+        st.caption(f"{len(questions)} unique questions")
+        if questions:
+            out_dir = tempfile.mkdtemp(prefix="stylequery-batch-")
+            try:
+                runner = BatchRunner(llm_handler, db_manager, concurrency, config.BATCH_MAX_RETRIES)
+                writer = ResultWriter(out_dir, result_format)
+                progress = st.progress(0.0)
+                table = st.empty()
+                records = []
+                try:
+                    for record in runner.run(questions, writer):
+                        records.append(record)
+                        progress.progress(len(records) / len(questions),
+                                          text=f"{len(records)}/{len(questions)} • {runner.throughput():.2f} questions/s")
+                        table.dataframe(pd.DataFrame(records).sort_values("index"), use_container_width=True)
+                finally:
+                    writer.close()
                 
-                st.session_state.messages.append({
-                    "role": "assistant",
-                    "content": web_result
-                })
+                stats = runner.stats
+                st.success(f"✅ {stats['answered']}/{stats['questions']} answered in {stats['seconds']:.1f}s "
+                           f"({runner.throughput():.2f} questions/s, {stats['retries']} rate-limit retries)")
+                archive = shutil.make_archive(out_dir, "zip", out_dir)
+                with open(archive, "rb") as f:
+                    data = f.read()
+            finally:
+                # The download button keeps its own copy of the zip
+                shutil.rmtree(out_dir, ignore_errors=True)
+                if os.path.exists(out_dir + ".zip"):
+                    os.remove(out_dir + ".zip")
+            st.download_button("Download results", data, file_name="batch_results.zip", mime="application/zip")
@@ -0,0 +1,228 @@
+"""
+Batch mode: answer a file of questions in one run, writing each result as it finishes
+
+Usage: python batch.py questions.csv --out results/ [--format parquet|csv] [--concurrency 4]
+"""
+
+import argparse
+import csv
+import io
+import json
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from example_index import normalize_question
+
+SUMMARY_FIELDS = ['index', 'question', 'sql_query', 'viz_type', 'rows', 'seconds', 'retries', 'error', 'result_file']
+
+def read_questions(source, name=None, problems=None):
+    """Questions from a CSV (``question`` column, else the first) or JSONL file.
+
+    ``source`` is a path or a binary file object such as a Streamlit upload.
+    JSONL lines that aren't valid JSON or lack a ``question`` are skipped and
+    reported as (line number, reason) in ``problems`` when a list is given.
+    """
+    name = name or source
+    if isinstance(source, str):
+        with open(source, 'rb') as f:
+            data = f.read()
+    else:
+        data = source.read()
+    text = data.decode('utf-8-sig')
+
+    if str(name).lower().endswith(('.jsonl', '.ndjson', '.json')):
+        questions = []
+        for number, line in enumerate(text.splitlines(), 1):
+            if not line.strip():
+                continue
+            try:
+                item = json.loads(line)
+            except json.JSONDecodeError as e:
+                reason = f"invalid JSON: {e.msg}"
+            else:
+                if not isinstance(item, dict):
+                    questions.append(str(item))
+                    continue
+                if str(item.get('question') or '').strip():
+                    questions.append(str(item['question']))
+                    continue
+                reason = "no 'question' key"
+            if problems is not None:
+                problems.append((number, reason))
+        return questions
+
+    rows = list(csv.reader(io.StringIO(text)))
+    if not rows:
+        return []
+    header = [cell.strip().lower() for cell in rows[0]]
+    if 'question' in header:
+        column = header.index('question')
+        rows = rows[1:]
+    else:
+        column = 0
+    return [row[column] for row in rows if len(row) > column and row[column].strip()]
+
+def dedupe(questions):
+    """Drop repeats that differ only in case, punctuation or spacing; keeps first-seen order"""
+    seen, unique = set(), []
+    for question in questions:
+        key = normalize_question(question)
+        if key and key not in seen:
+            seen.add(key)
+            unique.append(question.strip())
+    return unique
+
+def is_rate_limited(error):
+    """True for Groq 429s, whichever client layer raised them"""
+    status = getattr(error, 'status_code', None) or getattr(getattr(error, 'response', None), 'status_code', None)
+    return status == 429 or 'rate limit' in str(error).lower()
+
+def retry_after(error):
+    """Seconds the provider asked us to wait, if it said"""
+    headers = getattr(getattr(error, 'response', None), 'headers', None) or {}
+    try:
+        return float(headers.get('retry-after'))
+    except (TypeError, ValueError):
+        return None
+
+class ResultWriter:
+    """Writes one result file per question and appends a summary row as each one lands"""
+
+    def __init__(self, out_dir, fmt='parquet'):
+        if fmt not in ('parquet', 'csv'):
+            raise ValueError(f"Unsupported format: {fmt}")
+        os.makedirs(out_dir, exist_ok=True)
+        self.out_dir = out_dir
+        self.fmt = fmt
+        self.summary_path = os.path.join(out_dir, 'summary.csv')
+        self._lock = threading.Lock()
+        self._summary = open(self.summary_path, 'w', newline='', encoding='utf-8')
+        self._csv = csv.DictWriter(self._summary, fieldnames=SUMMARY_FIELDS)
+        self._csv.writeheader()
+
+    def write(self, record, df):
+        if df is not None:
+            path = os.path.join(self.out_dir, f"{record['index']:05d}.{self.fmt}")
+            if self.fmt == 'parquet':
+                df.to_parquet(path, index=False)
+            else:
+                df.to_csv(path, index=False)
+            record['result_file'] = os.path.basename(path)
+        with self._lock:
+            self._csv.writerow(record)
+            self._summary.flush()
+
+    def close(self):
+        self._summary.close()
+
+class BatchRunner:
+    """Generates and runs SQL for many questions with ``concurrency`` in flight.
+
+    LLM calls that hit the provider's rate limit are retried with exponential
+    backoff (honouring Retry-After); queries go through the manager's shared
+    connection pool, so concurrency above the pool size just queues there.
+    """
+
+    def __init__(self, llm_handler, db_manager, concurrency=4, max_retries=5, base_delay=1.0, max_delay=60.0):
+        self.llm_handler = llm_handler
+        self.db_manager = db_manager
+        self.concurrency = max(1, concurrency)
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.stats = {'questions': 0, 'answered': 0, 'failed': 0, 'retries': 0, 'rows': 0, 'seconds': 0.0}
+
+    def _generate(self, question):
+        """(sql_query, viz_type, retries), backing off while rate limited"""
+        for attempt in range(self.max_retries + 1):
+            try:
+                sql_query, viz_type = self.llm_handler.generate_sql(question, raise_errors=True)
+                return sql_query, viz_type, attempt
+            except Exception as e:
+                if not is_rate_limited(e) or attempt == self.max_retries:
+                    raise
+                delay = retry_after(e) or min(self.max_delay, self.base_delay * 2 ** attempt)
+                time.sleep(delay * random.uniform(1.0, 1.25))
+
+    def _answer(self, index, question):
+        start = time.perf_counter()
+        record = {'index': index, 'question': question, 'sql_query': None, 'viz_type': None,
+                  'rows': 0, 'retries': 0, 'error': None, 'result_file': None}
+        df = None
+        try:
+            sql_query, viz_type, record['retries'] = self._generate(question)
+            record.update(sql_query=sql_query, viz_type=viz_type)
+            if sql_query:
+                df = self.db_manager.execute_query(sql_query, raise_errors=True)
+                record['rows'] = 0 if df is None else len(df)
+                self.llm_handler.remember(question, sql_query, viz_type)
+            else:
+                record['error'] = 'no SQL generated'
+        except Exception as e:
+            record['error'] = f"{type(e).__name__}: {e}"
+        record['seconds'] = round(time.perf_counter() - start, 3)
+        return record, df
+
+    def run(self, questions, writer=None):
+        """Yield summary records in completion order, writing each result first"""
+        start = time.perf_counter()
+        self.stats['questions'] = len(questions)
+        with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix='batch') as executor:
+            futures = [executor.submit(self._answer, index, question) for index, question in enumerate(questions)]
+            for future in as_completed(futures):
+                record, df = future.result()
+                if writer is not None:
+                    try:
+                        writer.write(record, df)
+                    except Exception as e:
+                        record['error'] = f"write failed: {e}"
+                        writer.write(record, None)
+                self.stats['failed' if record['error'] else 'answered'] += 1
+                self.stats['retries'] += record['retries']
+                self.stats['rows'] += record['rows']
+                self.stats['seconds'] = time.perf_counter() - start
+                yield record
+
+    def throughput(self):
+        """Questions finished per second so far"""
+        done = self.stats['answered'] + self.stats['failed']
+        return done / self.stats['seconds'] if self.stats['seconds'] else 0.0
+
+def main():
+    from config import config
+
+    parser = argparse.ArgumentParser(description="Answer a CSV/JSONL file of questions in one run")
+    parser.add_argument('questions', help="CSV with a 'question' column, or JSONL with a 'question' key")
+    parser.add_argument('--out', default='batch_results', help="directory for summary.csv and result files")
+    parser.add_argument('--format', choices=['parquet', 'csv'], default='parquet')
+    parser.add_argument('--concurrency', type=int, default=config.BATCH_CONCURRENCY)
+    parser.add_argument('--max-retries', type=int, default=config.BATCH_MAX_RETRIES)
+    args = parser.parse_args()
+
+    from database import db_manager
+    from llm_handler import llm_handler
+
+    problems = []
+    questions = read_questions(args.questions, problems=problems)
+    for number, reason in problems:
+        print(f"line {number} skipped: {reason}")
+    unique = dedupe(questions)
+    print(f"{len(unique)} questions ({len(questions) - len(unique)} duplicates dropped)")
+
+    runner = BatchRunner(llm_handler, db_manager, args.concurrency, args.max_retries)
+    writer = ResultWriter(args.out, args.format)
+    try:
+        for record in runner.run(unique, writer):
+            status = f"error: {record['error']}" if record['error'] else f"{record['rows']} rows"
+            print(f"[{record['index']}] {record['seconds']:.2f}s {status} - {record['question']}")
+    finally:
+        writer.close()
+
+    stats = runner.stats
+    print(f"{stats['answered']}/{stats['questions']} answered, {stats['retries']} retries, "
+          f"{stats['seconds']:.1f}s, {runner.throughput():.2f} questions/s -> {writer.summary_path}")
+
+if __name__ == '__main__':
+    main()
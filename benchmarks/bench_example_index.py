@@ -0,0 +1,91 @@
+"""
+Benchmark: BM25 example index vs. the old per-question word-overlap scan
+
+Usage: python benchmarks/bench_example_index.py [--examples 50000] [--queries 500]
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from example_index import ExampleIndex
+from few_shot_prompts import few_shot_prompts
+
+BRANDS = ['Nike', 'Adidas', 'Puma', 'Levis', 'Zara', 'Gucci', 'Versace', 'H&M', 'Reebok', 'Uniqlo']
+CATEGORIES = ['shirts', 'jeans', 'shoes', 'blazers', 'jackets', 'socks', 'joggers', 'backpacks', 'hoodies']
+COLORS = ['white', 'black', 'red', 'blue', 'green', 'grey', 'yellow']
+SIZES = ['XS', 'S', 'M', 'L', 'XL', 'XXL']
+MATERIALS = ['cotton', 'denim', 'leather', 'wool', 'synthetic', 'linen']
+TEMPLATES = [
+    "How many {brand} {category} in {size} size?",
+    "Total value of {color} {brand} {category}?",
+    "Average price of {material} {category} for women?",
+    "Show top {n} {category} brands by stock",
+    "{color} {material} {category} count?",
+    "Which {brand} {category} are {color}?",
+]
+
+def synthetic_examples(count, seed=0):
+    rng = random.Random(seed)
+    examples = list(few_shot_prompts)
+    while len(examples) < count:
+        question = rng.choice(TEMPLATES).format(
+            brand=rng.choice(BRANDS), category=rng.choice(CATEGORIES),
+            color=rng.choice(COLORS), size=rng.choice(SIZES),
+            material=rng.choice(MATERIALS), n=rng.randint(3, 10)
+        )
+        examples.append({'Question': question, 'SQLQuery': 'SELECT 1;', 'Visualization': 'number'})
+    return examples[:count]
+
+def linear_scan(examples, question, top_k=3):
+    """The retrieval LLMHandler.get_similar_examples used to do"""
+    question_words = set(question.lower().split())
+    scored = []
+    for example in examples:
+        score = len(question_words & set(example['Question'].lower().split()))
+        if score > 0:
+            scored.append((score, example))
+    scored.sort(reverse=True, key=lambda x: x[0])
+    return [ex[1] for ex in scored[:top_k]]
+
+def timed(fn, queries):
+    """Per-query latencies in ms, sorted"""
+    latencies = []
+    for query in queries:
+        start = time.perf_counter()
+        fn(query)
+        latencies.append((time.perf_counter() - start) * 1000)
+    return sorted(latencies)
+
+def percentile(latencies, pct):
+    return latencies[min(len(latencies) - 1, int(len(latencies) * pct / 100))]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--examples', type=int, default=50000)
+    parser.add_argument('--queries', type=int, default=500)
+    parser.add_argument('--top-k', type=int, default=3)
+    args = parser.parse_args()
+
+    examples = synthetic_examples(args.examples)
+    queries = [ex['Question'] for ex in synthetic_examples(args.queries, seed=1)]
+
+    start = time.perf_counter()
+    index = ExampleIndex(examples)
+    build_ms = (time.perf_counter() - start) * 1000
+
+    index_ms = timed(lambda q: index.search(q, args.top_k), queries)
+    scan_ms = timed(lambda q: linear_scan(examples, q, args.top_k), queries[:50])
+
+    print(f"examples:     {len(examples):,}")
+    print(f"index build:  {build_ms:,.1f} ms")
+    for name, latencies in (('BM25 index', index_ms), ('linear scan', scan_ms)):
+        print(f"{name + ':':13} p50 {percentile(latencies, 50):.3f} ms   p99 {percentile(latencies, 99):.3f} ms")
+    print(f"speedup:      {percentile(scan_ms, 50) / percentile(index_ms, 50):,.0f}x at p50")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+"""
+Cold-start and rerun cost of the Streamlit app
+
+Imports each module in a fresh interpreter under ``-X importtime`` and reports
+the median wall time plus the heaviest top-level packages, then runs app.py
+through Streamlit's AppTest to time the first script run and later reruns.
+
+Usage: python benchmarks/bench_import.py [--runs 5] [--reruns 20] [--top 10]
+"""
+
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODULES = ['config', 'llm_handler', 'database', 'pipeline', 'web_search', 'batch', 'app']
+IMPORTTIME_RE = re.compile(r"^import time:\s+(\d+) \|\s+\d+ \|\s*(\S+)$")
+
+# No real Groq key or MySQL needed: nothing should connect while importing
+ENV = dict(os.environ, GROQ_API_KEY='bench', SERPER_API_KEY='bench', SQL_CACHE_PATH=':memory:', FAST_PATH='false')
+
+def import_once(module):
+    """(wall seconds, {top-level package: self µs summed over its modules}) for one cold import"""
+    code = f"import time; t = time.perf_counter(); import {module}; print(time.perf_counter() - t)"
+    proc = subprocess.run([sys.executable, '-X', 'importtime', '-c', code], cwd=ROOT, env=ENV,
+                          capture_output=True, text=True, check=True)
+    packages = {}
+    for line in proc.stderr.splitlines():
+        match = IMPORTTIME_RE.match(line)
+        if match:
+            name = match.group(2).split('.')[0]
+            packages[name] = packages.get(name, 0) + int(match.group(1))
+    return float(proc.stdout.strip().splitlines()[-1]), packages
+
+def bench_imports(runs, top):
+    report = {}
+    for module in MODULES:
+        walls, samples = [], []
+        for _ in range(runs):
+            wall, packages = import_once(module)
+            walls.append(wall)
+            samples.append(packages)
+        heaviest = sorted(samples[-1].items(), key=lambda item: -item[1])[:top]
+        report[module] = {
+            'median_ms': round(statistics.median(walls) * 1000, 1),
+            'heaviest_ms': {name: round(us / 1000, 1) for name, us in heaviest},
+        }
+    return report
+
+def bench_reruns(reruns):
+    """First run and median rerun of app.py, in a fresh interpreter"""
+    code = f"""
+import json, statistics, time
+from streamlit.testing.v1 import AppTest
+t = time.perf_counter()
+app = AppTest.from_file('app.py', default_timeout=60).run()
+first = time.perf_counter() - t
+times = []
+for _ in range({reruns}):
+    t = time.perf_counter()
+    app.run()
+    times.append(time.perf_counter() - t)
+print(json.dumps({{'first_run_ms': round(first * 1000, 1),
+                  'rerun_median_ms': round(statistics.median(times) * 1000, 1),
+                  'exceptions': [str(e.value) for e in app.exception]}}))
+"""
+    proc = subprocess.run([sys.executable, '-c', code], cwd=ROOT, env=ENV, capture_output=True, text=True)
+    if proc.returncode:
+        return {'error': proc.stderr.strip().splitlines()[-1]}
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5, help="cold imports per module")
+    parser.add_argument('--reruns', type=int, default=20, help="app.py reruns to time")
+    parser.add_argument('--top', type=int, default=10, help="heaviest packages to list")
+    parser.add_argument('--output', help="write the report as JSON here")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    report = {'imports': bench_imports(args.runs, args.top), 'app': bench_reruns(args.reruns)}
+    report['bench_s'] = round(time.perf_counter() - start, 1)
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+
+if __name__ == '__main__':
+    main()
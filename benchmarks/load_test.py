@@ -0,0 +1,273 @@
+"""
+Load test for the NL -> SQL pipeline against local stand-ins
+
+Replays the few-shot question corpus (plus a few out-of-scope questions)
+through Pipeline with a fake ChatGroq, a synthetic clothing_data in SQLite
+and a local HTTP stub in place of Serper. Reports per-stage p50/p95/p99,
+throughput with N concurrent sessions and peak memory.
+
+Usage:
+    python benchmarks/load_test.py --rows 100000 --sessions 8 --output baseline.json
+    python benchmarks/load_test.py --compare baseline.json   # exit 1 on regression
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import re
+import resource
+import sqlite3
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Settings for the stand-ins; must be in place before the app modules import config
+os.environ.setdefault('GROQ_API_KEY', 'load-test')
+os.environ.setdefault('SERPER_API_KEY', 'load-test')
+os.environ.setdefault('FAST_PATH', 'false')
+os.environ['SQL_CACHE_PATH'] = ':memory:'
+os.environ['WEB_CACHE_PATH'] = ':memory:'
+
+from benchmarks.stubs import start_serper_stub
+from few_shot_prompts import few_shot_prompts
+
+OUT_OF_SCOPE = [
+    "Who founded Nike?",
+    "What is the weather in Mumbai today?",
+    "Latest fashion trends this winter",
+    "How do I wash a wool sweater?",
+]
+
+BRANDS = ['Nike', 'Adidas', 'Puma', 'Levis', 'Zara', 'Gucci', 'Versace', 'H&M']
+CATEGORIES = ['Shirt', 'T-Shirt', 'Jeans', 'Shoes', 'Blazer', 'Jacket', 'Socks', 'Joggers', 'Backpack']
+COLORS = ['White', 'Black', 'Red', 'Blue', 'Green', 'Grey']
+SIZES = ['XS', 'S', 'M', 'L', 'XL', 'XXL']
+MATERIALS = ['Cotton', 'Denim', 'Leather', 'Wool', 'Synthetic']
+GENDERS = ['Men', 'Women', 'Unisex']
+
+def fake_usage(prompt, content):
+    return {
+        'input_tokens': len(prompt) // 4, 'output_tokens': len(content) // 4,
+        'total_tokens': (len(prompt) + len(content)) // 4
+    }
+
+class FakeResponse:
+    def __init__(self, content, usage_metadata=None):
+        self.content = content
+        self.usage_metadata = usage_metadata
+        self.response_metadata = {}
+
+class FakeChatGroq:
+    """Deterministic ChatGroq stand-in: answers corpus questions with their SQL after a delay.
+
+    ``trailing_words`` appends an explanation after the SQL, as models
+    sometimes do; streamed responses spread the delay over their tokens,
+    with the first token arriving after ``first_token`` of it.
+    """
+
+    def __init__(self, latency=0.8, jitter=0.2, seed=0, trailing_words=0, first_token=0.3):
+        self.latency = latency
+        self.jitter = jitter
+        self.rng = random.Random(seed)
+        self.trailing_words = trailing_words
+        self.first_token = first_token
+        self.answers = {ex['Question']: ex['SQLQuery'] for ex in few_shot_prompts}
+
+    def _content(self, prompt):
+        question = re.findall(r"^Question: (.*)$", prompt, re.MULTILINE)[-1]
+        # Out-of-scope questions get no SQL, like generate_sql failing
+        sql_query = self.answers.get(question.strip(), '')
+        if sql_query and self.trailing_words:
+            sql_query += "\n\nThis query " + " ".join(["filters"] * self.trailing_words) + "."
+        return sql_query
+
+    def _answer(self, prompt):
+        content = self._content(prompt)
+        return FakeResponse(content, fake_usage(prompt, content))
+
+    def _delay(self):
+        return max(0.0, self.rng.gauss(self.latency, self.jitter))
+
+    def _chunks(self, prompt):
+        """(delay before chunk, chunk) pairs splitting the total delay across ~4-character tokens.
+
+        Like Groq, usage is only reported in a final, empty chunk.
+        """
+        content, delay = self._content(prompt), self._delay()
+        tokens = re.findall(r".{1,4}", content, re.DOTALL) or ['']
+        per_token = delay * (1 - self.first_token) / len(tokens)
+        for i, token in enumerate(tokens):
+            yield (delay * self.first_token if i == 0 else 0.0) + per_token, FakeResponse(token)
+        yield 0.0, FakeResponse('', fake_usage(prompt, content))
+
+    def invoke(self, prompt):
+        time.sleep(self._delay())
+        return self._answer(prompt)
+
+    async def ainvoke(self, prompt):
+        await asyncio.sleep(self._delay())
+        return self._answer(prompt)
+
+    def stream(self, prompt):
+        for delay, chunk in self._chunks(prompt):
+            time.sleep(delay)
+            yield chunk
+
+    async def astream(self, prompt):
+        for delay, chunk in self._chunks(prompt):
+            await asyncio.sleep(delay)
+            yield chunk
+
+def build_database(path, rows, seed=0):
+    """Synthetic clothing_data with the production schema"""
+    rng = random.Random(seed)
+    connection = sqlite3.connect(path)
+    connection.execute("""
+        CREATE TABLE clothing_data (
+            SKU TEXT, Brand TEXT, Category TEXT, Color TEXT, Size TEXT,
+            Price_INR INTEGER, Stock INTEGER, Material TEXT, Gender TEXT
+        )
+    """)
+    batch = 50000
+    for start in range(0, rows, batch):
+        connection.executemany(
+            "INSERT INTO clothing_data VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            [
+                (f"SKU{i:08d}", rng.choice(BRANDS), rng.choice(CATEGORIES), rng.choice(COLORS),
+                 rng.choice(SIZES), rng.randint(300, 25000), rng.randint(0, 200),
+                 rng.choice(MATERIALS), rng.choice(GENDERS))
+                for i in range(start, min(rows, start + batch))
+            ]
+        )
+    connection.commit()
+    connection.close()
+
+def percentiles(samples):
+    if not samples:
+        return {'count': 0}
+    ordered = sorted(samples)
+    pick = lambda pct: ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+    return {
+        'count': len(ordered),
+        'p50_ms': round(pick(50) * 1000, 3),
+        'p95_ms': round(pick(95) * 1000, 3),
+        'p99_ms': round(pick(99) * 1000, 3),
+    }
+
+async def run_sessions(pipeline, questions, sessions, turns, seed):
+    stages = {'total': []}
+
+    async def session(n):
+        rng = random.Random(seed + n)
+        for _ in range(turns):
+            start = time.perf_counter()
+            turn = await pipeline.run(rng.choice(questions))
+            stages['total'].append(time.perf_counter() - start)
+            for stage, seconds in turn['timings'].items():
+                stages.setdefault(stage, []).append(seconds)
+
+    start = time.perf_counter()
+    await asyncio.gather(*[session(n) for n in range(sessions)])
+    return stages, time.perf_counter() - start
+
+def run(args):
+    os.environ['SERPER_URL'] = f"http://127.0.0.1:{start_serper_stub(args.search_latency).server_port}/search"
+
+    from database import DatabaseManager, sqlite_connector
+    from fast_path import load_vocabulary
+    from llm_handler import LLMHandler
+    from pipeline import Pipeline
+    from web_search import web_search_fallback
+
+    workdir = tempfile.mkdtemp(prefix='stylequery-bench-')
+    db_path = os.path.join(workdir, 'clothing.db')
+    start = time.perf_counter()
+    build_database(db_path, args.rows, args.seed)
+    load_seconds = time.perf_counter() - start
+
+    db_manager = DatabaseManager(connect=sqlite_connector(db_path), pool_size=args.pool_size)
+    if not args.result_cache:
+        db_manager.result_cache.max_bytes = 0
+    llm_handler = LLMHandler(llm=FakeChatGroq(args.llm_latency, args.llm_jitter, args.seed, args.trailing_words))
+    llm_handler.streaming = not args.no_streaming
+    if not args.sql_cache:
+        llm_handler.sql_cache.max_entries = 0
+    if llm_handler.sql_guard:
+        llm_handler.sql_guard.load_vocabulary = lambda: load_vocabulary(db_manager)
+    pipeline = Pipeline(llm_handler, db_manager, web_search_fallback)
+
+    questions = [ex['Question'] for ex in few_shot_prompts] + OUT_OF_SCOPE
+
+    tracemalloc.start()
+    stages, elapsed = asyncio.run(run_sessions(pipeline, questions, args.sessions, args.turns, args.seed))
+    _, peak_traced = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    completed = len(stages['total'])
+    return {
+        'config': {
+            'rows': args.rows, 'sessions': args.sessions, 'turns': args.turns,
+            'llm_latency_s': args.llm_latency, 'search_latency_s': args.search_latency,
+            'pool_size': args.pool_size, 'sql_cache': args.sql_cache, 'result_cache': args.result_cache,
+            'trailing_words': args.trailing_words, 'streaming': not args.no_streaming,
+        },
+        'stages': {stage: percentiles(samples) for stage, samples in stages.items()},
+        'throughput_turns_per_s': round(completed / elapsed, 3),
+        'elapsed_s': round(elapsed, 3),
+        'load_s': round(load_seconds, 3),
+        'peak_python_mb': round(peak_traced / 1024 / 1024, 2),
+        'max_rss_mb': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 2),
+        'pool': db_manager.pool_stats(),
+    }
+
+def compare(report, baseline, threshold):
+    """Regressions of p95 latency or throughput beyond ``threshold`` (a fraction)"""
+    regressions = []
+    for stage, stats in baseline.get('stages', {}).items():
+        now = report['stages'].get(stage, {})
+        if 'p95_ms' in stats and 'p95_ms' in now and now['p95_ms'] > stats['p95_ms'] * (1 + threshold):
+            regressions.append(f"{stage} p95 {stats['p95_ms']} -> {now['p95_ms']} ms")
+    before, after = baseline.get('throughput_turns_per_s'), report['throughput_turns_per_s']
+    if before and after < before * (1 - threshold):
+        regressions.append(f"throughput {before} -> {after} turns/s")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=10000, help="synthetic clothing_data rows (10k-10M)")
+    parser.add_argument('--sessions', type=int, default=8, help="concurrent chat sessions")
+    parser.add_argument('--turns', type=int, default=25, help="questions per session")
+    parser.add_argument('--llm-latency', type=float, default=0.8, help="mean fake LLM latency, seconds")
+    parser.add_argument('--llm-jitter', type=float, default=0.2)
+    parser.add_argument('--trailing-words', type=int, default=0, help="explanation words the fake LLM adds after the SQL")
+    parser.add_argument('--no-streaming', action='store_true', help="wait for whole LLM responses")
+    parser.add_argument('--search-latency', type=float, default=0.3, help="Serper stub latency, seconds")
+    parser.add_argument('--pool-size', type=int, default=5)
+    parser.add_argument('--sql-cache', action='store_true', help="leave the question->SQL cache on")
+    parser.add_argument('--result-cache', action='store_true', help="leave the result cache on")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help="write the report as JSON here")
+    parser.add_argument('--compare', help="baseline JSON to diff against")
+    parser.add_argument('--threshold', type=float, default=0.2, help="allowed regression, fraction")
+    args = parser.parse_args()
+
+    report = run(args)
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(report, json.load(f), args.threshold)
+        for regression in regressions:
+            print(f"REGRESSION {regression}", file=sys.stderr)
+        sys.exit(1 if regressions else 0)
+
+if __name__ == '__main__':
+    main()
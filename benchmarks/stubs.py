@@ -0,0 +1,44 @@
+"""
+Local stand-ins for external services, shared by the load test and the tests
+"""
+
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+def start_serper_stub(latency=0.0):
+    """Local HTTP server answering like google.serper.dev/search.
+
+    ``server.requests`` counts the POSTs received; set ``server.status`` to a
+    non-200 code to make it fail.
+    """
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+            with self.server.lock:
+                self.server.requests += 1
+            time.sleep(latency)
+            if self.server.status != 200:
+                self.send_error(self.server.status)
+                return
+            payload = json.dumps({'organic': [{
+                'title': f"Result for {body.get('q', '')}",
+                'snippet': 'Stub search result.',
+                'link': 'http://localhost/stub'
+            }]}).encode()
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    server.lock = threading.Lock()
+    server.requests = 0
+    server.status = 200
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
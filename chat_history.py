@@ -0,0 +1,124 @@
+"""
+Per-session chat history that keeps old results small: previews in memory,
+full frames spilled to disk, and each chart stored once as serialized JSON
+"""
+
+import itertools
+import os
+import shutil
+import sys
+import time
+import uuid
+import pandas as pd
+
+def frame_bytes(df):
+    return int(df.memory_usage(deep=True).sum()) if df is not None else 0
+
+def purge_stale(root, max_age=86400.0):
+    """Delete spill directories of sessions idle for longer than ``max_age`` seconds"""
+    if not os.path.isdir(root):
+        return
+    cutoff = time.time() - max_age
+    for name in os.listdir(root):
+        path = os.path.join(root, name)
+        try:
+            if os.path.isdir(path) and os.path.getmtime(path) < cutoff:
+                shutil.rmtree(path, ignore_errors=True)
+        except OSError:
+            pass
+
+class ChatHistory:
+    """Messages of one chat session, held within ``max_bytes`` of memory.
+
+    Assistant results are kept as a ``preview_rows`` head plus their shape;
+    larger frames are written to ``spill_dir`` and read back on demand.
+    Figures are stored as JSON the first time they are drawn so reruns
+    don't rebuild them. Past the memory cap, the oldest previews and
+    figures are dropped; small results are spilled first, so every
+    result remains loadable.
+    """
+
+    def __init__(self, spill_dir, preview_rows=20, max_bytes=16 * 1024 * 1024, page_size=10):
+        self.spill_dir = os.path.join(spill_dir, uuid.uuid4().hex)
+        self.preview_rows = preview_rows
+        self.max_bytes = max_bytes
+        self.page_size = page_size
+        self.messages = []
+        self.pages = 1  # how many page_size slices of the transcript are shown
+        self._ids = itertools.count()
+
+    def add_user(self, content):
+        self.messages.append({'id': next(self._ids), 'role': 'user', 'content': content})
+
+    def add_assistant(self, content, df=None, viz_type=None, sql_query=None, figure=None):
+        """Store an answer; ``figure`` is the chart as a Plotly JSON string"""
+        message = {'id': next(self._ids), 'role': 'assistant', 'content': content,
+                   'sql_query': sql_query, 'viz_type': viz_type, 'figure': figure}
+        if df is not None:
+            message.update(rows=len(df), columns=list(map(str, df.columns)),
+                           preview=df.head(self.preview_rows).copy(), result_path=None)
+            if len(df) > self.preview_rows:
+                message['result_path'] = self._spill(message['id'], df)
+        self.messages.append(message)
+        self._enforce_cap()
+        return message
+
+    def _spill(self, message_id, df):
+        os.makedirs(self.spill_dir, exist_ok=True)
+        path = os.path.join(self.spill_dir, f"{message_id}.parquet")
+        try:
+            df.to_parquet(path, index=False)
+        except (ValueError, TypeError, ImportError):
+            path = os.path.join(self.spill_dir, f"{message_id}.pkl")
+            df.to_pickle(path)
+        return path
+
+    def load_result(self, message):
+        """Full result of an answer: the spilled frame, else the preview"""
+        path = message.get('result_path')
+        if path and os.path.exists(path):
+            return pd.read_parquet(path) if path.endswith('.parquet') else pd.read_pickle(path)
+        return message.get('preview')
+
+    def memory_bytes(self):
+        return sum(
+            frame_bytes(message.get('preview')) + len(message.get('figure') or '')
+            + sys.getsizeof(message['content'])
+            for message in self.messages
+        )
+
+    def _enforce_cap(self):
+        """Drop the oldest previews and figures until the history fits in max_bytes"""
+        used = self.memory_bytes()
+        # The newest answer is always kept whole
+        for message in self.messages[:-1]:
+            if used <= self.max_bytes:
+                break
+            if message.get('preview') is not None or message.get('figure'):
+                # A preview of a small result is the whole result; keep it on disk
+                if message.get('preview') is not None and not message.get('result_path'):
+                    message['result_path'] = self._spill(message['id'], message['preview'])
+                used -= frame_bytes(message.get('preview')) + len(message.get('figure') or '')
+                message['preview'] = None
+                message['figure'] = None
+
+    def visible(self):
+        """(hidden count, messages to render); older turns stay hidden until show_more"""
+        shown = self.pages * self.page_size
+        hidden = max(0, len(self.messages) - shown)
+        return hidden, self.messages[hidden:]
+
+    def show_more(self):
+        self.pages += 1
+
+    def clear(self):
+        self.messages = []
+        self.pages = 1
+        shutil.rmtree(self.spill_dir, ignore_errors=True)
+
+    def stats(self):
+        return {
+            'messages': len(self.messages),
+            'memory_kb': round(self.memory_bytes() / 1024, 1),
+            'spilled': sum(1 for message in self.messages if message.get('result_path')),
+        }
@@ -38,6 +38,82 @@ class Config:
     def DB_NAME(self):
         return self.get('DB_NAME', 'cloth_brand_analysis')
     
+    @property
+    def DB_POOL_SIZE(self):
+        return int(self.get('DB_POOL_SIZE', 5))
+    
+    @property
+    def DB_POOL_TIMEOUT(self):
+        return float(self.get('DB_POOL_TIMEOUT', 10))
+    
+    @property
+    def RESULT_CACHE_MAX_MB(self):
+        return int(self.get('RESULT_CACHE_MAX_MB', 64))
+    
+    @property
+    def RESULT_CACHE_PROBE_INTERVAL(self):
+        return float(self.get('RESULT_CACHE_PROBE_INTERVAL', 30))
+    
+    @property
+    def STREAM_CHUNK_SIZE(self):
+        return int(self.get('STREAM_CHUNK_SIZE', 1000))
+    
+    @property
+    def MAX_RESULT_ROWS(self):
+        return int(self.get('MAX_RESULT_ROWS', 100000))
+    
+    @property
+    def MAX_RESULT_MB(self):
+        return int(self.get('MAX_RESULT_MB', 50))
+    
+    @property
+    def REPLICA(self):
+        return str(self.get('REPLICA', 'false')).lower() in ('1', 'true', 'yes')
+    
+    @property
+    def REPLICA_REFRESH_INTERVAL(self):
+        return float(self.get('REPLICA_REFRESH_INTERVAL', 300))
+    
+    @property
+    def BATCH_CONCURRENCY(self):
+        return int(self.get('BATCH_CONCURRENCY', 4))
+    
+    @property
+    def BATCH_MAX_RETRIES(self):
+        return int(self.get('BATCH_MAX_RETRIES', 5))
+    
+    @property
+    def HISTORY_DIR(self):
+        return self.get('HISTORY_DIR', '.cache/history')
+    
+    @property
+    def HISTORY_PREVIEW_ROWS(self):
+        return int(self.get('HISTORY_PREVIEW_ROWS', 20))
+    
+    @property
+    def HISTORY_MAX_MB(self):
+        return float(self.get('HISTORY_MAX_MB', 16))
+    
+    @property
+    def HISTORY_PAGE_SIZE(self):
+        return int(self.get('HISTORY_PAGE_SIZE', 10))
+    
+    @property
+    def LLM_STREAMING(self):
+        return str(self.get('LLM_STREAMING', 'true')).lower() in ('1', 'true', 'yes')
+    
+    @property
+    def SQL_GUARD(self):
+        return str(self.get('SQL_GUARD', 'true')).lower() in ('1', 'true', 'yes')
+    
+    @property
+    def SQL_GUARD_RETRIES(self):
+        return int(self.get('SQL_GUARD_RETRIES', 2))
+    
+    @property
+    def SQL_MAX_EXPLAIN_ROWS(self):
+        return int(self.get('SQL_MAX_EXPLAIN_ROWS', 0))
+    
     @property
     def TEMPERATURE(self):
         return float(self.get('TEMPERATURE', 0.1))
@@ -45,5 +121,98 @@ class Config:
     @property
     def TOP_K(self):
         return int(self.get('TOP_K', 3))
+    
+    @property
+    def PROMPT_TOKEN_BUDGET(self):
+        return int(self.get('PROMPT_TOKEN_BUDGET', 1500))
+    
+    @property
+    def RETRIEVER(self):
+        return self.get('RETRIEVER', 'bm25')
+    
+    @property
+    def EMBEDDING_MODEL(self):
+        return self.get('EMBEDDING_MODEL', 'hashed')
+    
+    @property
+    def VECTOR_STORE_PATH(self):
+        return self.get('VECTOR_STORE_PATH', '.cache/example_vectors')
+    
+    @property
+    def FAST_PATH(self):
+        return str(self.get('FAST_PATH', 'true')).lower() in ('1', 'true', 'yes')
+    
+    @property
+    def FAST_PATH_MIN_CONFIDENCE(self):
+        return float(self.get('FAST_PATH_MIN_CONFIDENCE', 1.0))
+    
+    @property
+    def LLM_TIMEOUT(self):
+        return float(self.get('LLM_TIMEOUT', 30))
+    
+    @property
+    def DB_TIMEOUT(self):
+        return float(self.get('DB_TIMEOUT', 30))
+    
+    @property
+    def WEB_TIMEOUT(self):
+        return float(self.get('WEB_TIMEOUT', 10))
+    
+    @property
+    def SERPER_URL(self):
+        return self.get('SERPER_URL', 'https://google.serper.dev/search')
+    
+    @property
+    def WEB_SEARCH_TIMEOUT(self):
+        return float(self.get('WEB_SEARCH_TIMEOUT', 5))
+    
+    @property
+    def WEB_CACHE_PATH(self):
+        return self.get('WEB_CACHE_PATH', '.cache/web_cache.db')
+    
+    @property
+    def WEB_CACHE_TTL(self):
+        return int(self.get('WEB_CACHE_TTL', 21600))
+    
+    @property
+    def WEB_CACHE_MAX_ENTRIES(self):
+        return int(self.get('WEB_CACHE_MAX_ENTRIES', 500))
+    
+    @property
+    def WEB_BREAKER_THRESHOLD(self):
+        return int(self.get('WEB_BREAKER_THRESHOLD', 5))
+    
+    @property
+    def WEB_BREAKER_RESET(self):
+        return float(self.get('WEB_BREAKER_RESET', 30))
+    
+    @property
+    def METRICS_PORT(self):
+        # Empty (as in .env.example) leaves the endpoint off
+        return int(self.get('METRICS_PORT') or 0)
+    
+    @property
+    def METRICS_HOST(self):
+        return self.get('METRICS_HOST') or '127.0.0.1'
+    
+    @property
+    def TRACE_LOG(self):
+        return self.get('TRACE_LOG', '')
+    
+    @property
+    def SQL_CACHE_PATH(self):
+        return self.get('SQL_CACHE_PATH', '.cache/sql_cache.db')
+    
+    @property
+    def SQL_CACHE_TTL(self):
+        return int(self.get('SQL_CACHE_TTL', 86400))
+    
+    @property
+    def SQL_CACHE_MAX_ENTRIES(self):
+        return int(self.get('SQL_CACHE_MAX_ENTRIES', 1000))
+    
+    @property
+    def SQL_CACHE_THRESHOLD(self):
+        return float(self.get('SQL_CACHE_THRESHOLD', 0.85))
 
 config = Config()
@@ -1,11 +1,276 @@
-import mysql.connector
-from mysql.connector import Error
+import queue
+import re
+import sqlite3
+import threading
+import time
+import zlib
+from contextlib import contextmanager
 import pandas as pd
 from config import config
+from result_cache import ResultCache, TABLE_VERSION_SQL
+from metrics import metrics
 import streamlit as st
 
+# pandas wraps DB-API errors from raw connections in its own DatabaseError;
+# the MySQL driver's error class is added when the driver is first imported
+DB_ERRORS = (sqlite3.Error, pd.errors.DatabaseError)
+
+# Low-cardinality text columns of clothing_data
+CATEGORY_COLUMNS = ('Brand', 'Category', 'Color', 'Size', 'Gender', 'Material')
+
+class PoolTimeout(Exception):
+    """No connection became free within the pool's max wait"""
+
+def mysql_connector():
+    """The MySQL driver, imported on first connect rather than at app start"""
+    global DB_ERRORS
+    import mysql.connector
+    if mysql.connector.Error not in DB_ERRORS:
+        DB_ERRORS = DB_ERRORS + (mysql.connector.Error,)
+    return mysql.connector
+
+def sqlite_connector(path: str):
+    """Connection factory for running DatabaseManager against a SQLite file"""
+    def connect():
+        connection = sqlite3.connect(path, check_same_thread=False)
+        # MySQL functions used by the table checksum in result_cache.py
+        connection.create_function('CRC32', 1, lambda text: zlib.crc32(str(text).encode()) if text is not None else None)
+        connection.create_function('CONCAT_WS', -1, lambda sep, *values: sep.join(str(v) for v in values if v is not None))
+        return connection
+    return connect
+
+def is_healthy(connection):
+    """Cheap liveness check done on every checkout"""
+    try:
+        if hasattr(connection, 'is_connected'):
+            return connection.is_connected()
+        cursor = connection.cursor()
+        cursor.execute('SELECT 1')
+        cursor.fetchall()
+        cursor.close()
+        return True
+    except Exception:
+        return False
+
+class ConnectionPool:
+    """Bounded, thread-safe pool of DB-API connections.
+
+    At most ``size`` connections are checked out at once; callers wait up to
+    ``timeout`` seconds for one to free up. Idle connections are health
+    checked on checkout and replaced if they went stale.
+    """
+
+    def __init__(self, connect, size=5, timeout=10.0):
+        self._connect = connect
+        self.size = size
+        self.timeout = timeout
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+        self._lock = threading.Lock()
+        self._stats = {
+            'in_use': 0, 'created': 0, 'discarded': 0, 'checkouts': 0,
+            'timeouts': 0, 'wait_total_s': 0.0, 'wait_max_s': 0.0
+        }
+
+    def _checkout(self):
+        while True:
+            try:
+                connection = self._idle.get_nowait()
+            except queue.Empty:
+                connection = self._connect()
+                with self._lock:
+                    self._stats['created'] += 1
+                return connection
+            if is_healthy(connection):
+                return connection
+            self._close(connection)
+            with self._lock:
+                self._stats['discarded'] += 1
+
+    @staticmethod
+    def _close(connection):
+        try:
+            connection.close()
+        except Exception:
+            pass
+
+    @contextmanager
+    def connection(self):
+        """Check out a healthy connection for the duration of the block"""
+        start = time.perf_counter()
+        if not self._slots.acquire(timeout=self.timeout):
+            with self._lock:
+                self._stats['timeouts'] += 1
+            raise PoolTimeout(f"all {self.size} connections busy for {self.timeout}s")
+        waited = time.perf_counter() - start
+
+        try:
+            connection = self._checkout()
+        except BaseException:
+            self._slots.release()
+            raise
+
+        with self._lock:
+            self._stats['in_use'] += 1
+            self._stats['checkouts'] += 1
+            self._stats['wait_total_s'] += waited
+            self._stats['wait_max_s'] = max(self._stats['wait_max_s'], waited)
+        try:
+            yield connection
+        finally:
+            self._idle.put(connection)
+            with self._lock:
+                self._stats['in_use'] -= 1
+            self._slots.release()
+
+    def close_all(self):
+        while True:
+            try:
+                self._close(self._idle.get_nowait())
+            except queue.Empty:
+                break
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+        stats['idle'] = self._idle.qsize()
+        stats['size'] = self.size
+        stats['wait_avg_s'] = stats['wait_total_s'] / stats['checkouts'] if stats['checkouts'] else 0.0
+        return stats
+
+# The leading SELECT of a query, where MySQL takes optimizer hints
+SELECT_RE = re.compile(r"^\s*SELECT\b(?!\s*/\*\+)", re.IGNORECASE)
+
+def downcast(df):
+    """Categoricals for the dimension columns, narrowest ints for the rest"""
+    for column in df.columns:
+        dtype = df[column].dtype
+        if column in CATEGORY_COLUMNS and (dtype == object or pd.api.types.is_string_dtype(dtype)):
+            df[column] = df[column].astype('category')
+        elif pd.api.types.is_integer_dtype(dtype):
+            df[column] = pd.to_numeric(df[column], downcast='integer')
+    return df
+
+class QueryStream:
+    """Chunks of a query result fetched through a server-side cursor.
+
+    Iterating yields downcast DataFrame chunks as they arrive and stops once
+    ``max_rows`` or ``max_bytes`` is reached, setting ``truncated``. On
+    MySQL, SELECTs carry a MAX_EXECUTION_TIME hint of ``timeout`` seconds so
+    the server gives up on a query the caller stopped waiting for.
+    """
+
+    def __init__(self, manager, query, chunk_size, max_rows, max_bytes, timeout=None):
+        self.manager = manager
+        self.query = query
+        self.timeout = timeout
+        self.chunk_size = chunk_size
+        self.max_rows = max_rows
+        self.max_bytes = max_bytes
+        self.chunks = []
+        self.rows = 0
+        self.bytes = 0
+        self.truncated = False
+        self.cancelled = False
+        self.error = None
+        self.source = None
+
+    def __iter__(self):
+        start = time.perf_counter()
+        try:
+            yield from self._fetch()
+        finally:
+            metrics.record(
+                'execute_query', time.perf_counter() - start, source=self.source,
+                rows=self.rows, bytes=self.bytes, truncated=self.truncated,
+                error=type(self.error).__name__ if self.error else None
+            )
+
+    def _fetch(self):
+        cached = self.manager.result_cache.get(self.query)
+        if cached is not None:
+            self.source = 'cache'
+            if len(cached) > self.max_rows:
+                cached = cached.iloc[:self.max_rows]
+                self.truncated = True
+            chunk = downcast(cached)
+            self._add(chunk)
+            yield chunk
+            return
+
+        replicated = self.manager.replica.query(self.query) if self.manager.replica else None
+        if replicated is not None:
+            self.source = 'replica'
+            if len(replicated) > self.max_rows:
+                replicated = replicated.iloc[:self.max_rows]
+                self.truncated = True
+            chunk = downcast(replicated)
+            self._add(chunk)
+            yield chunk
+            return
+
+        self.source = 'db'
+        start = time.perf_counter()
+        try:
+            with self.manager.pool.connection() as connection:
+                cursor = connection.cursor()
+                cursor.execute(self._statement(connection))
+                columns = [d[0] for d in cursor.description]
+                while not self.cancelled:
+                    size = min(self.chunk_size, self.max_rows - self.rows)
+                    rows = cursor.fetchmany(size) if size > 0 else []
+                    if not rows:
+                        break
+                    chunk = downcast(pd.DataFrame.from_records(rows, columns=columns, coerce_float=True))
+                    self._add(chunk)
+                    yield chunk
+                    if self.rows >= self.max_rows or self.bytes >= self.max_bytes:
+                        self.truncated = cursor.fetchone() is not None
+                        break
+
+                if self.truncated or self.cancelled:
+                    # Drop the connection rather than drain the rest of the result;
+                    # the pool replaces it on the next checkout
+                    ConnectionPool._close(connection)
+                else:
+                    cursor.close()
+        except PoolTimeout as e:
+            self.error = e
+            st.error(f"Database busy: {e}")
+            return
+        except DB_ERRORS as e:
+            self.error = e
+            st.error(f"Query execution failed: {e}")
+            return
+
+        if not (self.truncated or self.cancelled):
+            self.manager.result_cache.put(self.query, self.frame(), time.perf_counter() - start)
+
+    def _statement(self, connection):
+        """The query with a MySQL execution time limit, if one applies"""
+        if not self.timeout or isinstance(connection, sqlite3.Connection):
+            return self.query
+        return SELECT_RE.sub(f"SELECT /*+ MAX_EXECUTION_TIME({int(self.timeout * 1000)}) */", self.query, count=1)
+
+    def cancel(self):
+        """Stop fetching after the chunk in flight (safe from another thread)"""
+        self.cancelled = True
+
+    def _add(self, chunk):
+        self.chunks.append(chunk)
+        self.rows += len(chunk)
+        self.bytes += int(chunk.memory_usage(deep=True).sum())
+
+    def frame(self):
+        """Everything fetched so far as one DataFrame"""
+        if not self.chunks:
+            return None
+        if len(self.chunks) == 1:
+            return self.chunks[0]
+        return downcast(pd.concat(self.chunks, ignore_index=True))
+
 class DatabaseManager:
-    def __init__(self):
+    def __init__(self, connect=None, pool_size=None, pool_timeout=None):
         self.config = {
             'host': config.DB_HOST,
             'port': config.DB_PORT,
@@ -14,32 +279,121 @@ class DatabaseManager:
             'database': config.DB_NAME,
             'autocommit': True
         }
-        self.connection = None
-    
+        self.pool = ConnectionPool(
+            connect or self._mysql_connect,
+            size=pool_size or config.DB_POOL_SIZE,
+            timeout=pool_timeout or config.DB_POOL_TIMEOUT
+        )
+        self.result_cache = ResultCache(
+            max_bytes=config.RESULT_CACHE_MAX_MB * 1024 * 1024,
+            probe=self._table_version,
+            probe_interval=config.RESULT_CACHE_PROBE_INTERVAL
+        )
+        # Optional in-memory copy of clothing_data, see replica.py
+        self.replica = None
+
+    def _mysql_connect(self):
+        return mysql_connector().connect(**self.config)
+
     def connect(self):
         try:
-            self.connection = mysql.connector.connect(**self.config)
-            if self.connection.is_connected():
+            with self.pool.connection():
                 return True
-        except Error as e:
+        except (PoolTimeout, *DB_ERRORS) as e:
             st.error(f"Database connection failed: {e}")
             return False
-    
+
     def disconnect(self):
-        if self.connection and self.connection.is_connected():
-            self.connection.close()
-    
-    def execute_query(self, query: str):
-        try:
-            if not self.connection or not self.connection.is_connected():
-                if not self.connect():
-                    return None
-            
-            df = pd.read_sql(query, self.connection)
+        self.pool.close_all()
+
+    def pool_stats(self):
+        return self.pool.stats()
+
+    def _table_version(self):
+        """Fingerprint of clothing_data used to invalidate cached results"""
+        try:
+            with self.pool.connection() as connection:
+                cursor = connection.cursor()
+                cursor.execute(TABLE_VERSION_SQL)
+                version = tuple(cursor.fetchone())
+                cursor.close()
+            return version
+        except (PoolTimeout, *DB_ERRORS):
+            return None
+
+    def estimate_rows(self, query: str):
+        """Rows MySQL expects to examine for a query, from EXPLAIN; None if unknown"""
+        try:
+            with self.pool.connection() as connection:
+                cursor = connection.cursor()
+                cursor.execute(f"EXPLAIN {query}")
+                columns = [column[0].lower() for column in cursor.description]
+                plan = cursor.fetchall()
+                cursor.close()
+        except (PoolTimeout, *DB_ERRORS):
+            return None
+        if 'rows' not in columns:
+            return None  # e.g. SQLite's EXPLAIN lists opcodes
+        # Nested-loop joins examine the product of each step's rows
+        estimate = 1
+        for step in plan:
+            rows = step[columns.index('rows')]
+            if rows:
+                estimate *= int(rows)
+        return estimate
+
+    def execute_query(self, query: str, raise_errors=False):
+        try:
+            with metrics.span('execute_query') as span:
+                df = self.result_cache.get(query)
+                span['source'] = 'cache'
+                if df is None and self.replica:
+                    df = self.replica.query(query)
+                    span['source'] = 'replica'
+                if df is None:
+                    span['source'] = 'db'
+                    start = time.perf_counter()
+                    with self.pool.connection() as connection:
+                        df = pd.read_sql(query, connection)
+                    self.result_cache.put(query, df, time.perf_counter() - start)
+                span['rows'] = len(df)
+                span['bytes'] = int(df.memory_usage(deep=True).sum())
             return df
-            
-        except Error as e:
-            st.error(f"Query execution failed: {e}")
+
+        except (PoolTimeout, *DB_ERRORS) as e:
+            if raise_errors:
+                raise
+            if isinstance(e, PoolTimeout):
+                st.error(f"Database busy: {e}")
+            else:
+                st.error(f"Query execution failed: {e}")
             return None
 
-db_manager = DatabaseManager()
+    def execute_query_stream(self, query: str, chunk_size=None, max_rows=None, max_bytes=None, timeout=None):
+        """Fetch a query in chunks, capped at MAX_RESULT_ROWS / MAX_RESULT_MB and
+        ``timeout`` seconds (DB_TIMEOUT) of server execution time"""
+        return QueryStream(
+            self, query,
+            chunk_size=chunk_size or config.STREAM_CHUNK_SIZE,
+            max_rows=max_rows or config.MAX_RESULT_ROWS,
+            max_bytes=max_bytes or config.MAX_RESULT_MB * 1024 * 1024,
+            timeout=timeout or config.DB_TIMEOUT
+        )
+
+@st.cache_resource
+def get_db_manager():
+    """Process-wide DatabaseManager, so the pool and caches survive reruns"""
+    db_manager = DatabaseManager()
+    if config.REPLICA:
+        from replica import InventoryReplica
+        try:
+            db_manager.replica = InventoryReplica(db_manager, config.REPLICA_REFRESH_INTERVAL).start()
+        except ImportError as e:
+            st.warning(f"In-memory replica disabled: {e}")
+    return db_manager
+
+def __getattr__(name):
+    # `from database import db_manager` builds the shared manager on first use
+    if name == 'db_manager':
+        return get_db_manager()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,95 @@
+"""
+Inverted index over the few-shot examples, scored with BM25
+"""
+
+import re
+import numpy as np
+
+# Filler words that don't change what a question asks for
+STOPWORDS = {
+    'a', 'an', 'the', 'of', 'in', 'for', 'to', 'is', 'are', 'do', 'does', 'we',
+    'have', 'has', 'what', 'whats', 'how', 'me', 'show', 'give', 'tell', 'please',
+    'there', 'with', 'and', 's', 'our', 'all', 'list'
+}
+
+# Phrasings that mean the same thing
+SYNONYMS = {
+    'many': 'count', 'number': 'count', 'qty': 'count', 'quantity': 'count',
+    'womens': 'women', 'woman': 'women', 'mens': 'men', 'man': 'men',
+    'tshirt': 'shirt', 'tee': 'shirt', 'colour': 'color'
+}
+
+def normalize_question(question: str):
+    """Lowercase, strip punctuation and collapse whitespace"""
+    text = re.sub(r"[^a-z0-9\s]", " ", question.lower().replace("'", ""))
+    return " ".join(text.split())
+
+def tokenize(question: str, stopwords=STOPWORDS):
+    """Content words of a question, with plurals and synonyms folded"""
+    tokens = []
+    for word in normalize_question(question).split():
+        if len(word) > 3 and word.endswith('s') and not word.endswith('ss'):
+            word = word[:-1]
+        word = SYNONYMS.get(word, word)
+        if word not in stopwords:
+            tokens.append(word)
+    return tokens
+
+class ExampleIndex:
+    """BM25 index over example questions, built once.
+
+    Each term maps to the ids of the examples containing it and their
+    precomputed BM25 weights, so a query only touches the postings of its
+    own terms.
+    """
+
+    def __init__(self, examples, k1=1.5, b=0.75):
+        self.examples = list(examples)
+        self.k1 = k1
+        self.b = b
+
+        docs = [tokenize(example['Question']) for example in self.examples]
+        lengths = np.array([len(doc) for doc in docs], dtype=np.float32)
+        avg_length = float(lengths.mean()) if len(docs) and lengths.any() else 1.0
+
+        term_freqs = {}
+        for doc_id, doc in enumerate(docs):
+            for term in doc:
+                postings = term_freqs.setdefault(term, {})
+                postings[doc_id] = postings.get(doc_id, 0) + 1
+
+        n_docs = len(docs)
+        self.postings = {}
+        for term, postings in term_freqs.items():
+            ids = np.fromiter(postings.keys(), dtype=np.int32, count=len(postings))
+            tf = np.fromiter(postings.values(), dtype=np.float32, count=len(postings))
+            idf = np.log(1 + (n_docs - len(ids) + 0.5) / (len(ids) + 0.5))
+            norm = k1 * (1 - b + b * lengths[ids] / avg_length)
+            weights = (idf * tf * (k1 + 1) / (tf + norm)).astype(np.float32)
+            self.postings[term] = (ids, weights)
+
+    def __len__(self):
+        return len(self.examples)
+
+    def scores(self, question: str):
+        """BM25 score of every example for the question"""
+        hits = [self.postings[term] for term in set(tokenize(question)) if term in self.postings]
+        if not hits:
+            return np.zeros(len(self.examples))
+        ids = np.concatenate([ids for ids, _ in hits])
+        weights = np.concatenate([weights for _, weights in hits])
+        return np.bincount(ids, weights=weights, minlength=len(self.examples))
+
+    def search(self, question: str, top_k: int = 3):
+        """Return the top_k best matching examples, best first"""
+        if top_k <= 0 or not self.examples:
+            return []
+        scores = self.scores(question)
+
+        # Partial selection, then order just the winners
+        if top_k < len(scores):
+            top = np.argpartition(scores, -top_k)[-top_k:]
+        else:
+            top = np.arange(len(scores))
+        top = top[np.argsort(-scores[top], kind='stable')]
+        return [self.examples[i] for i in top if scores[i] > 0]
@@ -0,0 +1,248 @@
+"""
+Deterministic intent/slot parser that answers common question shapes without the LLM
+"""
+
+import threading
+import time
+from example_index import STOPWORDS, normalize_question, tokenize
+from few_shot_prompts import few_shot_prompts
+
+# Column each dimension word refers to
+DIMENSIONS = {
+    'brand': 'Brand', 'category': 'Category', 'color': 'Color', 'size': 'Size',
+    'gender': 'Gender', 'material': 'Material', 'fabric': 'Material', 'type': 'Category',
+    'categorie': 'Category'  # "categories" after plural folding
+}
+
+# Words that make a dimension a GROUP BY rather than a filter
+GROUPING_WORDS = {'by', 'per', 'each', 'distribution', 'breakdown', 'top', 'most', 'least', 'compare', 'bottom'}
+DESCENDING_WORDS = {'top', 'most', 'highest', 'best', 'largest'}
+ASCENDING_WORDS = {'least', 'lowest', 'bottom', 'fewest', 'smallest'}
+ABOVE_WORDS = {'over', 'above', 'more', 'greater', 'expensive'}
+BELOW_WORDS = {'under', 'below', 'less', 'cheaper', 'cheap'}
+
+VALUE_WORDS = {'value', 'worth', 'valuation'}
+AVERAGE_WORDS = {'average', 'avg', 'mean'}
+STOCK_WORDS = {'stock', 'inventory', 'count', 'total', 'unit', 'product', 'item', 'piece', 'available', 'store', 'stocked'}
+# Alone, these count rows ("how many products in the store"), not units in stock
+ITEM_WORDS = {'count', 'total', 'product', 'item', 'piece', 'store'}
+# Words naming the measure a number or an average refers to
+QUANTITY_WORDS = {'stock', 'inventory', 'count', 'unit', 'piece', 'stocked'}
+PRICE_WORDS = {'price', 'priced', 'cost', 'costing', 'rs', 'inr', 'rupee', 'expensive', 'cheap', 'cheaper'}
+FILLER_WORDS = {'than', 'sum'}
+KNOWN_WORDS = (GROUPING_WORDS | DESCENDING_WORDS | ASCENDING_WORDS | ABOVE_WORDS | BELOW_WORDS
+               | VALUE_WORDS | AVERAGE_WORDS | STOCK_WORDS | PRICE_WORDS | FILLER_WORDS)
+
+# Stopwords that are also column values (size 'S')
+VALUE_STOPWORDS = {'s'}
+
+def content_words(question: str):
+    """Words of a question minus filler stopwords, keeping those that are column values"""
+    return tokenize(question, stopwords=STOPWORDS - VALUE_STOPWORDS)
+
+def anchor_words(words):
+    """The words a question's SQL turns on, in order: numbers, dimension words and
+    column values (any word the parser has no other meaning for)"""
+    return tuple(word for word in words if word.isdigit() or word in DIMENSIONS or word not in KNOWN_WORDS)
+
+def measure_of(word):
+    if word in QUANTITY_WORDS:
+        return 'Stock'
+    if word in PRICE_WORDS:
+        return 'Price_INR'
+    return None
+
+class FastPath:
+    """Turns questions that match the few-shot shapes into SQL directly.
+
+    Handles SUM(Stock), SUM(Price_INR * Stock) and AVG(Price_INR)/AVG(Stock)
+    filtered by any mix of Brand/Category/Color/Size/Gender/Material values
+    and price or stock bounds, and top-N / "by <dimension>" GROUP BY queries.
+    Column values are matched on the question's raw words, so values like
+    size "S" aren't lost as stopwords. ``parse`` returns None unless every
+    word is accounted for and each number and average has a clear measure.
+    """
+
+    def __init__(self, load_vocabulary, min_confidence=1.0, retry_interval=60.0):
+        self.load_vocabulary = load_vocabulary
+        self.min_confidence = min_confidence
+        self.retry_interval = retry_interval
+        self._phrases = None
+        self._loaded_at = float('-inf')
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0}
+        self._examples = {
+            normalize_question(example['Question']): (example['SQLQuery'], example['Visualization'])
+            for example in few_shot_prompts
+        }
+
+    def _vocabulary(self):
+        """Token sequence -> {(column, value)} for every distinct value, loaded once"""
+        with self._lock:
+            # While the DB is unavailable, ask again at most every retry_interval
+            if self._phrases is None and time.monotonic() - self._loaded_at >= self.retry_interval:
+                self._loaded_at = time.monotonic()
+                phrases = {}
+                for column, values in (self.load_vocabulary() or {}).items():
+                    for value in values:
+                        tokens = tuple(tokenize(str(value).replace('-', ' '), stopwords=()))
+                        if tokens:
+                            phrases.setdefault(tokens, set()).add((column, str(value)))
+                if phrases:
+                    self._phrases = phrases
+            return self._phrases or {}
+
+    def _match_values(self, tokens):
+        """Greedy longest match of column values; returns filters and leftover tokens"""
+        phrases = self._vocabulary()
+        longest = max((len(p) for p in phrases), default=0)
+        filters, leftover, i = {}, [], 0
+        while i < len(tokens):
+            for length in range(min(longest, len(tokens) - i), 0, -1):
+                matches = phrases.get(tuple(tokens[i:i + length]))
+                if matches:
+                    if len(matches) > 1:
+                        return None, None  # value of several columns, ambiguous
+                    column, value = next(iter(matches))
+                    if filters.get(column, value) != value:
+                        return None, None
+                    filters[column] = value
+                    i += length
+                    break
+            else:
+                leftover.append(tokens[i])
+                i += 1
+        return filters, leftover
+
+    def parse(self, question: str):
+        """Return (sql_query, viz_type) or None when not confident"""
+        example = self._examples.get(normalize_question(question))
+        if example:
+            self.stats['hits'] += 1
+            return example
+
+        result = self._parse(question)
+        self.stats['hits' if result else 'misses'] += 1
+        return result
+
+    def _bound(self, words, i):
+        """(condition, positions of the words it used) for the number at ``words[i]``.
+
+        The measure is the word before the comparison ("stock under 10"),
+        else the one after the number ("over 1000 in stock"). Returns
+        (None, None) when the number isn't a bound or its measure is unclear.
+        """
+        j = i - 1 if i and words[i - 1] != 'than' else i - 2
+        if j < 0 or words[j] not in ABOVE_WORDS | BELOW_WORDS:
+            return None, None
+        operator = '>' if words[j] in ABOVE_WORDS else '<'
+        implied = measure_of(words[j])  # "cheaper than", "more expensive than"
+        for k in (j - 1, i + 1):
+            if 0 <= k < len(words) and measure_of(words[k]):
+                if implied and measure_of(words[k]) != implied:
+                    return None, None
+                return f"{measure_of(words[k])} {operator} {int(words[i])}", {j, k}
+        if implied:
+            return f"{implied} {operator} {int(words[i])}", {j}
+        return None, None
+
+    def _parse(self, question):
+        # Values are matched before stopwords go: size 'S' is also a stopword
+        tokens = tokenize(question, stopwords=())
+        filters, leftover = self._match_values(tokens)
+        if filters is None:
+            return None
+        matched = len(tokens) - len(leftover)
+        leftover = [word for word in leftover if word not in STOPWORDS]
+        if not matched and not leftover:
+            return None
+
+        conditions = [f"{column} = '{value.replace(chr(39), chr(39) * 2)}'" for column, value in filters.items()]
+        explained = matched
+        limit, order, words, dimensions = None, None, set(), set()
+        bound_words = set()  # positions of the comparison and measure words of bounds
+
+        for i, word in enumerate(leftover):
+            if word.isdigit():
+                previous = leftover[i - 1] if i else None
+                if previous in DESCENDING_WORDS | ASCENDING_WORDS:
+                    limit = int(word)
+                else:
+                    condition, used = self._bound(leftover, i)
+                    if condition is None:
+                        return None
+                    conditions.append(condition)
+                    bound_words |= used
+            elif word in DIMENSIONS:
+                dimensions.add(DIMENSIONS[word])
+            elif word in KNOWN_WORDS:
+                words.add(word)
+            else:
+                continue
+            explained += 1
+
+        if explained / (matched + len(leftover)) < self.min_confidence:
+            return None
+
+        # "XS size", "Nike brand": a dimension already pinned by a filter is filler
+        if not words & GROUPING_WORDS:
+            dimensions -= set(filters)
+        if len(dimensions) > 1:
+            return None
+        group_by = dimensions.pop() if dimensions else None
+
+        # Comparison words left without a number ("shirts under", "more Nike") are unclear
+        subject = {word for i, word in enumerate(leftover) if i not in bound_words}
+        if subject & (ABOVE_WORDS | BELOW_WORDS) - PRICE_WORDS:
+            return None
+        measures = {measure_of(word) for word in subject} - {None}
+
+        if words & DESCENDING_WORDS:
+            order = 'DESC'
+        elif words & ASCENDING_WORDS:
+            order = 'ASC'
+
+        if words & VALUE_WORDS:
+            metric, alias = 'SUM(Price_INR * Stock)', 'value'
+        elif words & AVERAGE_WORDS:
+            if len(measures) != 1:
+                return None  # "average of Nike shirts": of what?
+            metric, alias = f"AVG({measures.pop()})", 'avg'
+        elif 'Price_INR' in measures:
+            return None  # "price of Nike shirts" isn't a sum
+        else:
+            metric, alias = 'SUM(Stock)', 'total'
+        where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+
+        if group_by:
+            if not words & GROUPING_WORDS:
+                return None  # e.g. "Nike category count" means COUNT(DISTINCT ...)
+            sql_query = f"SELECT {group_by}, {metric} as {alias} FROM clothing_data{where} GROUP BY {group_by}"
+            if order or limit:
+                sql_query += f" ORDER BY {alias} {order or 'DESC'} LIMIT {limit or (5 if 'top' in words else 1)}"
+            else:
+                sql_query += f" ORDER BY {alias} DESC"
+            viz_type = 'pie_chart' if words & {'distribution', 'breakdown'} and not limit else 'bar_chart'
+            return sql_query + ";", viz_type
+
+        if order or limit or words & GROUPING_WORDS:
+            return None
+        if not conditions and not words & (STOCK_WORDS - ITEM_WORDS | VALUE_WORDS | AVERAGE_WORDS):
+            return None  # leave COUNT(*) vs SUM(Stock) to the LLM
+        return f"SELECT {metric} FROM clothing_data{where};", 'number'
+
+def load_vocabulary(db_manager=None):
+    """Distinct values of every dimension column of clothing_data; empty when the
+    DB can't be reached, without showing an error for it"""
+    import database
+    if db_manager is None:
+        db_manager = database.db_manager
+    vocabulary = {}
+    try:
+        for column in database.CATEGORY_COLUMNS:
+            df = db_manager.execute_query(f"SELECT DISTINCT {column} FROM clothing_data", raise_errors=True)
+            vocabulary[column] = df.iloc[:, 0].dropna().tolist()
+    # DB_ERRORS is read here, after the driver's errors were added to it
+    except (database.PoolTimeout, *database.DB_ERRORS):
+        return {}
+    return vocabulary
@@ -1,45 +1,270 @@
-from langchain_groq import ChatGroq
-from langchain_core.prompts import PromptTemplate
+import os
+import sqlite3
+import threading
+import time
 from config import config
 from few_shot_prompts import few_shot_prompts
+from example_index import ExampleIndex, normalize_question
+from fast_path import FastPath, anchor_words, content_words, load_vocabulary
+from metrics import metrics
+from prompt_builder import PromptBuilder, count_tokens, retry_prompt
+from sql_guard import SQLGuard, SQLValidationError, explain_rows
 import streamlit as st
 
+class SQLCache:
+    """Two-tier question -> (SQL, viz_type) cache persisted to SQLite.
+
+    The exact tier matches on normalized question text. The similarity tier
+    only considers cached questions with the same column values, numbers and
+    dimension words in the same order (so "top brand by color" never answers
+    "top color by brand"), and takes the one whose content words overlap
+    most, by Jaccard score. Entries expire after ``ttl`` seconds and the
+    least recently used ones are evicted past ``max_entries``.
+    """
+    
+    def __init__(self, path, ttl=86400, max_entries=1000, threshold=0.85):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.threshold = threshold
+        self.stats = {'exact_hits': 0, 'similar_hits': 0, 'misses': 0}
+        self._lock = threading.Lock()
+        
+        if path != ':memory:':
+            os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS sql_cache (
+                question TEXT PRIMARY KEY,
+                sql_query TEXT NOT NULL,
+                viz_type TEXT,
+                created_at REAL NOT NULL,
+                last_used REAL NOT NULL
+            )
+        """)
+        self._conn.commit()
+        
+        # Content words of every cached question, grouped by their anchor words
+        self._tokens = {}
+        self._by_anchors = {}
+        self._purge_expired()
+        for (question,) in self._conn.execute("SELECT question FROM sql_cache"):
+            self._index(question)
+    
+    def _index(self, key):
+        words = content_words(key)
+        self._tokens[key] = frozenset(words)
+        self._by_anchors.setdefault(anchor_words(words), set()).add(key)
+    
+    def _forget(self, key):
+        words = content_words(key)
+        self._tokens.pop(key, None)
+        keys = self._by_anchors.get(anchor_words(words))
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._by_anchors[anchor_words(words)]
+    
+    def _purge_expired(self):
+        cutoff = time.time() - self.ttl
+        expired = self._conn.execute(
+            "SELECT question FROM sql_cache WHERE created_at < ?", (cutoff,)
+        ).fetchall()
+        if expired:
+            self._conn.execute("DELETE FROM sql_cache WHERE created_at < ?", (cutoff,))
+            self._conn.commit()
+            for (question,) in expired:
+                self._forget(question)
+    
+    def _find_similar(self, question):
+        words = content_words(question)
+        anchors, tokens = anchor_words(words), frozenset(words)
+        if not anchors:
+            return None
+        best_key, best_score = None, 0.0
+        for key in self._by_anchors.get(anchors, ()):
+            other = self._tokens[key]
+            score = len(tokens & other) / len(tokens | other)
+            if score > best_score:
+                best_key, best_score = key, score
+        return best_key if best_score >= self.threshold else None
+    
+    def get(self, question: str):
+        """Return a cached (sql_query, viz_type) or None"""
+        key = normalize_question(question)
+        with self._lock:
+            self._purge_expired()
+            tier = 'exact_hits'
+            if key not in self._tokens:
+                key = self._find_similar(question)
+                tier = 'similar_hits'
+            if key is None:
+                self.stats['misses'] += 1
+                return None
+            
+            row = self._conn.execute(
+                "SELECT sql_query, viz_type FROM sql_cache WHERE question = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self._forget(key)
+                self.stats['misses'] += 1
+                return None
+            self._conn.execute(
+                "UPDATE sql_cache SET last_used = ? WHERE question = ?", (time.time(), key)
+            )
+            self._conn.commit()
+            self.stats[tier] += 1
+            return row[0], row[1]
+    
+    def put(self, question: str, sql_query: str, viz_type: str):
+        key = normalize_question(question)
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO sql_cache VALUES (?, ?, ?, ?, ?)",
+                (key, sql_query, viz_type, now, now)
+            )
+            self._index(key)
+            
+            overflow = len(self._tokens) - self.max_entries
+            if overflow > 0:
+                evicted = self._conn.execute(
+                    "SELECT question FROM sql_cache ORDER BY last_used LIMIT ?", (overflow,)
+                ).fetchall()
+                for (old_key,) in evicted:
+                    self._conn.execute("DELETE FROM sql_cache WHERE question = ?", (old_key,))
+                    self._forget(old_key)
+            self._conn.commit()
+    
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM sql_cache")
+            self._conn.commit()
+            self._tokens.clear()
+            self._by_anchors.clear()
+    
+    def hit_rate(self):
+        hits = self.stats['exact_hits'] + self.stats['similar_hits']
+        total = hits + self.stats['misses']
+        return hits / total if total else 0.0
+
+def token_usage(response):
+    """Prompt/completion token counts reported with a chat model response"""
+    usage = getattr(response, 'usage_metadata', None) or {}
+    return {
+        'prompt_tokens': usage.get('input_tokens', 0),
+        'completion_tokens': usage.get('output_tokens', 0)
+    }
+
+def statement_end(text: str):
+    """Index just past the first complete statement in (possibly partial) model
+    output: its ``;`` or closing code fence, outside string literals; else None"""
+    fenced = text.lstrip().startswith('```')
+    if fenced:
+        newline = text.find('\n', text.find('```'))
+        if newline == -1:
+            return None
+        i = newline + 1
+    else:
+        i = 0
+    quote = None
+    while i < len(text):
+        char = text[i]
+        if quote:
+            if char == quote:
+                quote = None
+        elif text.startswith('```', i):
+            return i + 3
+        elif char in ("'", '"', '`'):
+            quote = char
+        elif char == ';':
+            return i + 1
+        i += 1
+    return None
+
+def add_token_usage(span, response):
+    """Accumulate a response's token counts into a metrics span; True if it reported any"""
+    usage = token_usage(response)
+    for kind, count in usage.items():
+        span[kind] = span.get(kind, 0) + count
+    return any(usage.values())
+
+def estimate_token_usage(span, prompt: str, text: str):
+    """Local token counts for a stream closed before its final chunk, which is
+    the only one Groq sends usage in"""
+    span['prompt_tokens'] = span.get('prompt_tokens', 0) + count_tokens(prompt)
+    span['completion_tokens'] = span.get('completion_tokens', 0) + count_tokens(text)
+    span['usage_estimated'] = True
+
+@st.cache_resource
+def get_retriever(name: str):
+    """Few-shot example retriever: 'bm25' (default) or 'embedding', built once per process"""
+    if name == 'embedding':
+        from vector_store import VectorStore, get_embedder
+        return VectorStore(few_shot_prompts, get_embedder(config.EMBEDDING_MODEL), config.VECTOR_STORE_PATH)
+    return ExampleIndex(few_shot_prompts)
+
+@st.cache_resource
+def get_chat_model():
+    """Groq chat client, created on the first question that needs the LLM"""
+    from langchain_groq import ChatGroq
+    return ChatGroq(
+        model="llama-3.1-70b-versatile",
+        groq_api_key=config.GROQ_API_KEY,
+        temperature=config.TEMPERATURE
+    )
+
 class LLMHandler:
-    def __init__(self):
-        # Initialize Groq Chat Model
-        self.llm = ChatGroq(
-            model="llama-3.1-70b-versatile",
-            groq_api_key=config.GROQ_API_KEY,
-            temperature=config.TEMPERATURE
-        )
+    def __init__(self, llm=None):
+        # Groq Chat Model; the default client is only built when first used
+        self._llm = llm
         
         # Store few-shot examples in session
         self.few_shot_examples = few_shot_prompts
-    
-    def get_similar_examples(self, question: str, top_k: int = 3):
-        """Simple keyword-based matching for few-shot examples"""
-        question_lower = question.lower()
-        scored_examples = []
+        self.retriever = get_retriever(config.RETRIEVER)
         
-        for example in self.few_shot_examples:
-            score = 0
-            example_lower = example['question'].lower()
-            
-            # Count matching words
-            question_words = set(question_lower.split())
-            example_words = set(example_lower.split())
-            common_words = question_words.intersection(example_words)
-            score = len(common_words)
-            
-            if score > 0:
-                scored_examples.append((score, example))
+        self.prompt_builder = PromptBuilder(config.PROMPT_TOKEN_BUDGET)
+        
+        # Rule-based answers for common question shapes
+        self.fast_path = FastPath(load_vocabulary, config.FAST_PATH_MIN_CONFIDENCE) if config.FAST_PATH else None
+        
+        # Local checks and rewrites applied to every query before it runs
+        self.sql_guard = SQLGuard(
+            max_rows=config.MAX_RESULT_ROWS,
+            load_vocabulary=load_vocabulary,
+            explain=explain_rows,
+            max_estimated_rows=config.SQL_MAX_EXPLAIN_ROWS
+        ) if config.SQL_GUARD else None
+        self.guard_retries = config.SQL_GUARD_RETRIES
+        
+        # Read completions as a token stream and stop at the end of the statement
+        self.streaming = config.LLM_STREAMING
         
-        # Sort by score and return top_k
-        scored_examples.sort(reverse=True, key=lambda x: x[0])
-        return [ex[1] for ex in scored_examples[:top_k]]
+        # Cache of previously answered questions
+        self.sql_cache = SQLCache(
+            config.SQL_CACHE_PATH,
+            ttl=config.SQL_CACHE_TTL,
+            max_entries=config.SQL_CACHE_MAX_ENTRIES,
+            threshold=config.SQL_CACHE_THRESHOLD
+        )
+    
+    @property
+    def llm(self):
+        if self._llm is None:
+            self._llm = get_chat_model()
+        return self._llm
+    
+    @llm.setter
+    def llm(self, llm):
+        self._llm = llm
+    
+    def get_similar_examples(self, question: str, top_k: int = 3):
+        """Look up the closest few-shot examples with the configured retriever"""
+        with metrics.span('get_similar_examples'):
+            return self.retriever.search(question, top_k)
     
     def determine_viz_type(self, sql_query: str, question: str):
-        """Determine visualization type based on SQL query and question"""
+        """Chart suggested by the SQL and question; visualization.py picks the
+        final chart from the result and uses this only to prefer a pie over a bar"""
         sql_lower = sql_query.lower()
         question_lower = question.lower()
         
@@ -58,73 +283,174 @@ class LLMHandler:
         # Default to table
         return 'table'
     
-    def generate_sql(self, question: str):
+    def prepare_prompt(self, question: str):
+        """Few-shot prompt for a question, and its estimated size"""
+        similar_examples = self.get_similar_examples(question, config.TOP_K)
+        return self.prompt_builder.build(question, similar_examples)
+    
+    def clean_sql(self, text: str):
+        """Strip markdown code fences, and any explanation after the statement, from the model output"""
+        end = statement_end(text)
+        sql_query = (text[:end] if end else text).strip()
+        if sql_query.startswith('```sql'):
+            sql_query = sql_query[6:]
+        if sql_query.startswith('```'):
+            sql_query = sql_query[3:]
+        if sql_query.endswith('```'):
+            sql_query = sql_query[:-3]
+        return sql_query.strip()
+    
+    def guard(self, sql_query: str):
+        """The SQL to actually run; raises SQLValidationError if it must not run"""
+        if not sql_query or self.sql_guard is None:
+            return sql_query
+        with metrics.span('sql_guard'):
+            return self.sql_guard.check(sql_query)
+    
+    def _finish(self, question: str, content: str):
+        sql_query = self.guard(self.clean_sql(content))
+        
+        # Determine visualization type
+        viz_type = self.determine_viz_type(sql_query, question)
+        
+        return sql_query, viz_type
+    
+    def remember(self, question: str, sql_query: str, viz_type: str):
+        """Cache SQL for a question once it has run successfully; SQL the
+        database rejects or times out on is never cached"""
+        if sql_query:
+            self.sql_cache.put(question, sql_query, viz_type)
+    
+    def _complete(self, prompt: str, span):
+        """Model output for a prompt, cut off once the SQL statement is complete"""
+        if not self.streaming:
+            response = self.llm.invoke(prompt)
+            add_token_usage(span, response)
+            return response.content
+        
+        start, text, reported = time.perf_counter(), "", False
+        stream = self.llm.stream(prompt)
+        try:
+            for chunk in stream:
+                span.setdefault('first_token_ms', round((time.perf_counter() - start) * 1000, 1))
+                text += chunk.content or ""
+                reported |= add_token_usage(span, chunk)
+                end = statement_end(text)
+                if end is not None:
+                    span['stopped_early'] = True
+                    text = text[:end]
+                    break
+        finally:
+            stream.close()  # stops the rest of the generation
+        if not reported:
+            estimate_token_usage(span, prompt, text)
+        return text
+    
+    async def _acomplete(self, prompt: str, span, on_token=None):
+        """Async _complete; ``on_token(partial_sql)`` is called as the SQL arrives"""
+        if not self.streaming:
+            response = await self.llm.ainvoke(prompt)
+            add_token_usage(span, response)
+            return response.content
+        
+        start, text, reported = time.perf_counter(), "", False
+        stream = self.llm.astream(prompt)
+        try:
+            async for chunk in stream:
+                span.setdefault('first_token_ms', round((time.perf_counter() - start) * 1000, 1))
+                text += chunk.content or ""
+                reported |= add_token_usage(span, chunk)
+                end = statement_end(text)
+                if on_token:
+                    on_token(self.clean_sql(text))
+                if end is not None:
+                    span['stopped_early'] = True
+                    text = text[:end]
+                    break
+        finally:
+            await stream.aclose()
+        if not reported:
+            estimate_token_usage(span, prompt, text)
+        return text
+    
+    def answer_locally(self, question: str):
+        """(sql_query, viz_type) from the fast path or the cache, else None"""
+        lookups = ([self.fast_path.parse] if self.fast_path else []) + [self.sql_cache.get]
+        for lookup in lookups:
+            answer = lookup(question)
+            if answer:
+                try:
+                    return self.guard(answer[0]), answer[1]
+                except SQLValidationError:
+                    continue
+        return None
+    
+    def generate_sql(self, question: str, raise_errors=False):
         """Generate SQL query from natural language question"""
         try:
-            # Get similar examples
-            similar_examples = self.get_similar_examples(question, config.TOP_K)
+            with metrics.span('generate_sql') as span:
+                local = self.answer_locally(question)
+                if local:
+                    span['source'] = 'local'
+                    return local
+                
+                prompt, prompt_info = self.prepare_prompt(question)
+                span.update(prompt_info)
+                span['source'] = 'llm'
+                # Rejected SQL goes back to the model with the reason, never to the DB
+                for attempt in range(self.guard_retries + 1):
+                    content = self._complete(prompt, span)
+                    try:
+                        return self._finish(question, content)
+                    except SQLValidationError as e:
+                        span['rejected'] = attempt + 1
+                        if attempt == self.guard_retries:
+                            raise
+                        prompt = retry_prompt(prompt, self.clean_sql(content), e)
             
-            # Build few-shot examples string
-            examples_text = "\n\n".join([
-                f"Question: {ex['question']}\nSQL: {ex['sql']}"
-                for ex in similar_examples
-            ])
-            
-            # Create prompt
-            prompt_template = f"""You are an expert SQL query generator for a clothing inventory database.
-
-Database Schema:
-Table: clothing_data
-Columns:
-- SKU (TEXT): Unique product identifier
-- Brand (TEXT): Brand name (Nike, Adidas, Puma, etc.)
-- Category (TEXT): Product type (Shirt, Jeans, Shoes, etc.)
-- Color (TEXT): Product color
-- Size (TEXT): Size (XS, S, M, L, XL, XXL)
-- Price_INR (INTEGER): Price in Indian Rupees
-- Stock (INTEGER): Available quantity
-- Material (TEXT): Fabric/material type
-- Gender (TEXT): Target gender (Men, Women, Unisex)
-
-Few-shot Examples:
-{examples_text}
-
-Now generate a SQL query for this question:
-Question: {{question}}
-
-IMPORTANT RULES:
-1. Return ONLY the SQL query, no explanations
-2. Use proper SQL syntax for MySQL
-3. Always use SELECT statements
-4. For counting, use COUNT(*)
-5. For aggregations, use appropriate GROUP BY
-6. Column names are case-sensitive
-7. Use LIMIT when showing top results
-
-SQL:"""
-            
-            # Generate SQL directly with prompt
-            formatted_prompt = prompt_template.format(question=question)
-            response = self.llm.invoke(formatted_prompt)
-                        sql_query = response.content.strip()
-            
-            # Clean up the SQL query
-            if sql_query.startswith('```sql'):
-                sql_query = sql_query[6:]
-            if sql_query.startswith('```'):
-                sql_query = sql_query[3:]
-            if sql_query.endswith('```'):
-                sql_query = sql_query[:-3]
-            
-            sql_query = sql_query.strip()
-            
-            # Determine visualization type
-            viz_type = self.determine_viz_type(sql_query, question)
-            
-            return sql_query, viz_type
+        except Exception as e:
+            if raise_errors:
+                raise
+            st.error(f"Error generating SQL: {str(e)}")
+            return None, None
+    
+    async def agenerate_sql(self, question: str, on_token=None):
+        """Async generate_sql; cancelling it aborts the Groq request.
+        
+        ``on_token(partial_sql)`` is called as streamed SQL arrives.
+        """
+        try:
+            with metrics.span('generate_sql') as span:
+                local = self.answer_locally(question)
+                if local:
+                    span['source'] = 'local'
+                    return local
+                
+                prompt, prompt_info = self.prepare_prompt(question)
+                span.update(prompt_info)
+                span['source'] = 'llm'
+                # Rejected SQL goes back to the model with the reason, never to the DB
+                for attempt in range(self.guard_retries + 1):
+                    content = await self._acomplete(prompt, span, on_token)
+                    try:
+                        return self._finish(question, content)
+                    except SQLValidationError as e:
+                        span['rejected'] = attempt + 1
+                        if attempt == self.guard_retries:
+                            raise
+                        prompt = retry_prompt(prompt, self.clean_sql(content), e)
             
         except Exception as e:
             st.error(f"Error generating SQL: {str(e)}")
             return None, None
 
-llm_handler = LLMHandler()
+@st.cache_resource
+def get_llm_handler():
+    """Process-wide LLMHandler shared by every session and rerun"""
+    return LLMHandler()
+
+def __getattr__(name):
+    # `from llm_handler import llm_handler` builds the shared handler on first use
+    if name == 'llm_handler':
+        return get_llm_handler()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,153 @@
+"""
+Per-stage latency tracing and metrics, exported as Prometheus text and JSON log lines
+"""
+
+import bisect
+import json
+import logging
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Histogram bucket upper bounds, seconds
+BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+logger = logging.getLogger('stylequery.trace')
+logger.propagate = False
+
+class Metrics:
+    """Stage latency histograms and labelled counters, safe to share across threads.
+
+    Recording a span costs two perf_counter calls, a bisect and a lock;
+    JSON log lines are only built when the trace logger has a handler.
+    """
+
+    def __init__(self, prefix='stylequery'):
+        self.prefix = prefix
+        self._lock = threading.Lock()
+        self._histograms = {}
+        self._counters = {}
+        self._server = None
+
+    def observe(self, stage, seconds):
+        with self._lock:
+            histogram = self._histograms.get(stage)
+            if histogram is None:
+                histogram = self._histograms[stage] = [0] * (len(BUCKETS) + 1) + [0.0]
+            histogram[bisect.bisect_left(BUCKETS, seconds)] += 1
+            histogram[-1] += seconds
+
+    def inc(self, name, value=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def record(self, stage, seconds, **fields):
+        """Log a finished span; numeric ``rows``/``bytes``/token fields also feed counters"""
+        self.observe(stage, seconds)
+        if fields.get('error'):
+            self.inc('stage_errors_total', stage=stage)
+        for field in ('rows', 'bytes'):
+            if fields.get(field):
+                self.inc(f'query_{field}_total', fields[field], stage=stage)
+        for kind in ('prompt_tokens', 'completion_tokens'):
+            if fields.get(kind):
+                self.inc('llm_tokens_total', fields[kind], kind=kind.split('_')[0])
+        if logger.handlers:
+            logger.info(json.dumps({
+                'ts': round(time.time(), 3), 'span': stage,
+                'duration_ms': round(seconds * 1000, 3), **fields
+            }, default=str))
+
+    @contextmanager
+    def span(self, stage, **fields):
+        """Time a block; the yielded dict can be filled with rows, bytes, tokens..."""
+        start = time.perf_counter()
+        try:
+            yield fields
+        except BaseException as e:
+            fields['error'] = type(e).__name__
+            raise
+        finally:
+            self.record(stage, time.perf_counter() - start, **fields)
+
+    def traced(self, stage):
+        """Decorator form of span"""
+        def decorator(fn):
+            @wraps(fn)
+            def wrapper(*args, **kwargs):
+                with self.span(stage):
+                    return fn(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def render_prometheus(self):
+        """Prometheus text exposition format"""
+        with self._lock:
+            histograms = {stage: list(values) for stage, values in self._histograms.items()}
+            counters = dict(self._counters)
+
+        name = f"{self.prefix}_stage_seconds"
+        lines = [f"# HELP {name} Time spent in each request stage", f"# TYPE {name} histogram"]
+        for stage, values in sorted(histograms.items()):
+            cumulative = 0
+            for bound, count in zip(BUCKETS + ('+Inf',), values[:-1]):
+                cumulative += count
+                lines.append(f'{name}_bucket{{stage="{stage}",le="{bound}"}} {cumulative}')
+            lines.append(f'{name}_sum{{stage="{stage}"}} {values[-1]:.6f}')
+            lines.append(f'{name}_count{{stage="{stage}"}} {cumulative}')
+
+        typed = set()
+        for (counter, labels), value in sorted(counters.items()):
+            full_name = f"{self.prefix}_{counter}"
+            if full_name not in typed:
+                lines.append(f"# TYPE {full_name} counter")
+                typed.add(full_name)
+            label_text = ",".join(f'{k}="{v}"' for k, v in labels)
+            lines.append(f"{full_name}{{{label_text}}} {value}")
+        return "\n".join(lines) + "\n"
+
+    def serve(self, port, host='127.0.0.1'):
+        """Expose /metrics on a background HTTP server; safe to call on every rerun.
+        Only local scrapers can reach it unless ``host`` is set to e.g. 0.0.0.0"""
+        if self._server is not None or not port:
+            return
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?')[0] != '/metrics':
+                    self.send_error(404)
+                    return
+                body = metrics.render_prometheus().encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        with self._lock:
+            if self._server is not None:
+                return
+            try:
+                self._server = ThreadingHTTPServer((host, int(port)), Handler)
+            except OSError:
+                return  # port taken, e.g. by another worker process
+        threading.Thread(target=self._server.serve_forever, name='metrics-http', daemon=True).start()
+
+def configure_trace_log(target):
+    """Send JSON span lines to a file path, or 'stdout'; empty disables them"""
+    if not target or logger.handlers:
+        return
+    handler = logging.StreamHandler(sys.stdout) if target == 'stdout' else logging.FileHandler(target)
+    handler.setFormatter(logging.Formatter('%(message)s'))
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+
+metrics = Metrics()
@@ -0,0 +1,150 @@
+"""
+Async generate -> execute -> web fallback pipeline for one chat turn
+"""
+
+import asyncio
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from config import config
+from example_index import tokenize
+from few_shot_prompts import few_shot_prompts
+
+def _domain_terms():
+    """Words that tie a question to the inventory: schema words plus known column values"""
+    terms = set(tokenize(
+        "sku brand category color size price stock material gender inventory "
+        "product item clothing apparel store"
+    ))
+    for example in few_shot_prompts:
+        for literal in re.findall(r"'([^']+)'", example['SQLQuery']):
+            if not re.search(r"\d", literal):
+                terms.update(tokenize(literal.replace('%', ' ')))
+    return terms
+
+DOMAIN_TERMS = _domain_terms()
+
+# Threads for DB fetches and web searches. asyncio.run() joins the loop's
+# default executor on exit, which would hold a timed-out turn until its
+# blocked call returned; it doesn't wait for these.
+WORKERS = ThreadPoolExecutor(max_workers=32, thread_name_prefix='pipeline')
+
+def looks_out_of_domain(question: str):
+    """True when the question mentions nothing from the inventory vocabulary"""
+    return not DOMAIN_TERMS.intersection(tokenize(question))
+
+class Pipeline:
+    """Runs a chat turn as coroutines with per-stage timeouts.
+
+    The LLM call is awaited natively; the DB fetch and web search run on
+    ``WORKERS`` threads, so a stage that times out returns at once. The
+    query itself is bounded server-side by the same timeout. For questions that look out of domain the web search is
+    started speculatively alongside SQL generation and cancelled if SQL
+    comes back. Cancelling only stops a search that hasn't been sent yet:
+    a request already in flight on its worker thread runs to completion
+    (bounded by WEB_SEARCH_TIMEOUT) and its result is discarded.
+    """
+
+    def __init__(self, llm_handler, db_manager, web_search, llm_timeout=None, db_timeout=None, web_timeout=None):
+        self.llm_handler = llm_handler
+        self.db_manager = db_manager
+        self.web_search = web_search
+        self.llm_timeout = llm_timeout or config.LLM_TIMEOUT
+        self.db_timeout = db_timeout or config.DB_TIMEOUT
+        self.web_timeout = web_timeout or config.WEB_TIMEOUT
+
+    async def _execute(self, sql_query, on_chunk=None):
+        """Fetch on a worker thread, handing chunks back to the event loop as they arrive"""
+        loop = asyncio.get_running_loop()
+        chunks = asyncio.Queue()
+        stream = self.db_manager.execute_query_stream(sql_query, timeout=self.db_timeout)
+
+        def fetch():
+            try:
+                for chunk in stream:
+                    loop.call_soon_threadsafe(chunks.put_nowait, chunk)
+            finally:
+                loop.call_soon_threadsafe(chunks.put_nowait, None)
+
+        worker = loop.run_in_executor(WORKERS, fetch)
+        try:
+            while (chunk := await chunks.get()) is not None:
+                if on_chunk:
+                    on_chunk(chunk, stream)
+            await worker
+        except asyncio.CancelledError:
+            stream.cancel()
+            raise
+        return stream
+
+    async def _web(self, question, cancelled=None):
+        def search():
+            # Set once SQL came back; skip a search the worker hasn't started
+            if cancelled is not None and cancelled.is_set():
+                return None
+            return self.web_search(question)
+        loop = asyncio.get_running_loop()
+        return await asyncio.wait_for(loop.run_in_executor(WORKERS, search), self.web_timeout)
+
+    async def run(self, question: str, on_sql=None, on_chunk=None, on_token=None):
+        """Answer one question; returns a dict describing the turn.
+
+        ``on_token(partial_sql)``, ``on_sql(sql_query)`` and
+        ``on_chunk(chunk, stream)`` are called on the event loop thread as soon
+        as streamed SQL, the final SQL and result chunks are available.
+        """
+        turn = {
+            'question': question, 'sql_query': None, 'viz_type': None, 'stream': None,
+            'result_df': None, 'web_result': None, 'error': None, 'timings': {}
+        }
+        cancelled = threading.Event()
+        web_task = asyncio.create_task(self._web(question, cancelled)) if looks_out_of_domain(question) else None
+
+        try:
+            start = time.perf_counter()
+            try:
+                sql_query, viz_type = await asyncio.wait_for(
+                    self.llm_handler.agenerate_sql(question, on_token=on_token), self.llm_timeout
+                )
+            except asyncio.TimeoutError:
+                sql_query, viz_type = None, None
+                turn['error'] = f"SQL generation timed out after {self.llm_timeout}s"
+            turn['timings']['generate'] = time.perf_counter() - start
+
+            if sql_query:
+                if web_task:
+                    cancelled.set()
+                    web_task.cancel()
+                turn['sql_query'], turn['viz_type'] = sql_query, viz_type
+                if on_sql:
+                    on_sql(sql_query)
+
+                start = time.perf_counter()
+                try:
+                    stream = await asyncio.wait_for(self._execute(sql_query, on_chunk), self.db_timeout)
+                    turn['stream'] = stream
+                    turn['result_df'] = stream.frame()
+                    if stream.error:
+                        turn['error'] = str(stream.error)
+                    else:
+                        self.llm_handler.remember(question, sql_query, viz_type)
+                except asyncio.TimeoutError:
+                    turn['error'] = f"Query timed out after {self.db_timeout}s"
+                turn['timings']['execute'] = time.perf_counter() - start
+                return turn
+
+            start = time.perf_counter()
+            try:
+                turn['web_result'] = await (web_task or self._web(question))
+            except asyncio.TimeoutError:
+                turn['web_result'] = f"Web search timed out after {self.web_timeout}s"
+            turn['timings']['web_search'] = time.perf_counter() - start
+            return turn
+
+        finally:
+            if web_task and not web_task.done():
+                cancelled.set()
+                web_task.cancel()
+            elif web_task and not web_task.cancelled():
+                web_task.exception()  # mark a failed speculative search as retrieved
@@ -0,0 +1,102 @@
+"""
+Prompt assembly for SQL generation: fixed schema/rules prefix plus few-shot
+examples chosen under a token budget
+"""
+
+import functools
+import re
+
+# Identical on every call and placed first, so provider-side prompt caching can reuse it
+PREFIX = """You are an expert SQL query generator for a clothing inventory database.
+
+Database Schema:
+Table: clothing_data
+Columns:
+- SKU (TEXT): Unique product identifier
+- Brand (TEXT): Brand name (Nike, Adidas, Puma, etc.)
+- Category (TEXT): Product type (Shirt, Jeans, Shoes, etc.)
+- Color (TEXT): Product color
+- Size (TEXT): Size (XS, S, M, L, XL, XXL)
+- Price_INR (INTEGER): Price in Indian Rupees
+- Stock (INTEGER): Available quantity
+- Material (TEXT): Fabric/material type
+- Gender (TEXT): Target gender (Men, Women, Unisex)
+
+IMPORTANT RULES:
+1. Return ONLY the SQL query, no explanations
+2. Use proper SQL syntax for MySQL
+3. Always use SELECT statements
+4. For counting, use COUNT(*)
+5. For aggregations, use appropriate GROUP BY
+6. Column names are case-sensitive
+7. Use LIMIT when showing top results
+
+"""
+
+EXAMPLES_HEADER = "Few-shot Examples:\n"
+QUESTION_TEMPLATE = "\nNow generate a SQL query for this question:\nQuestion: {question}\n\nSQL:"
+RETRY_TEMPLATE = " {sql_query}\n\nThat query was rejected: {error}\nWrite a corrected query.\n\nSQL:"
+
+@functools.lru_cache(maxsize=None)
+def _load_tokenizer():
+    """cl100k_base's encoder, loaded on the first count (it may be downloaded)"""
+    try:
+        import tiktoken
+        return tiktoken.get_encoding('cl100k_base').encode
+    except Exception:
+        return None
+
+_WORD_RE = re.compile(r"\w+|[^\w\s]")
+
+def count_tokens(text: str):
+    """Token count with tiktoken when installed, else a word/punctuation estimate"""
+    encode = _load_tokenizer()
+    if encode is not None:
+        return len(encode(text))
+    # BPE vocabularies split long words; ~4 characters per token for the rest
+    return sum(max(1, len(piece) // 4) for piece in _WORD_RE.findall(text))
+
+def retry_prompt(prompt: str, sql_query: str, error):
+    """Follow-up prompt asking the model to fix a query that failed validation"""
+    return prompt + RETRY_TEMPLATE.format(sql_query=sql_query, error=error)
+
+def format_example(example):
+    return f"Question: {example['Question']}\nSQL: {example['SQLQuery']}\n\n"
+
+class PromptBuilder:
+    """Builds prompts that fit in ``token_budget``.
+
+    Examples are taken in retrieval order while they fit; the prefix and
+    each example's token count are computed once. The prefix and question
+    are always sent, so a question too long for the budget on its own gives
+    an over-budget prompt with no examples, flagged ``over_budget`` in info.
+    """
+
+    def __init__(self, token_budget=1500):
+        self.token_budget = token_budget
+        self.prefix_tokens = count_tokens(PREFIX + EXAMPLES_HEADER)
+        self._example_tokens = {}
+
+    def _tokens_for(self, text):
+        tokens = self._example_tokens.get(text)
+        if tokens is None:
+            tokens = self._example_tokens[text] = count_tokens(text)
+        return tokens
+
+    def build(self, question: str, examples):
+        """Return (prompt, info) where info holds the estimated prompt tokens, examples used
+        and whether the prompt is over budget"""
+        suffix = QUESTION_TEMPLATE.format(question=question)
+        used = self.prefix_tokens + count_tokens(suffix)
+
+        chosen = []
+        for example in examples:
+            text = format_example(example)
+            tokens = self._tokens_for(text)
+            if used + tokens > self.token_budget:
+                continue
+            chosen.append(text)
+            used += tokens
+
+        prompt = PREFIX + EXAMPLES_HEADER + "".join(chosen) + suffix
+        return prompt, {'estimated_prompt_tokens': used, 'examples': len(chosen), 'over_budget': used > self.token_budget}
@@ -0,0 +1,316 @@
+"""
+In-process DuckDB replica of clothing_data for serving generated SELECTs from RAM
+
+Usage: python replica.py --parity   (compare replica and MySQL on every few-shot query)
+"""
+
+import argparse
+import math
+import re
+import sqlite3
+import threading
+import time
+import pandas as pd
+from few_shot_prompts import few_shot_prompts
+from result_cache import ROW_CHECKSUM_SQL
+
+try:
+    import duckdb
+except ImportError:
+    duckdb = None
+
+LITERAL_RE = re.compile(r"'(?:[^']|'')*'")
+TOKEN_RE = re.compile(r"'(?:[^']|'')*'|`[^`]*`|\w+|[(),]|[^\s\w(),'`]+|\s+")
+
+# Past this share of changed rows a refresh reloads the whole table
+FULL_RELOAD_FRACTION = 0.2
+FETCH_BATCH = 1000
+
+def to_duckdb_sql(sql: str):
+    """Bridge the MySQL habits the replica would otherwise answer differently"""
+    parts, last = [], 0
+    for match in LITERAL_RE.finditer(sql):
+        parts.append(re.sub(r"\bLIKE\b", "ILIKE", sql[last:match.start()], flags=re.IGNORECASE))
+        parts.append(match.group())
+        last = match.end()
+    parts.append(re.sub(r"\bLIKE\b", "ILIKE", sql[last:], flags=re.IGNORECASE))
+    return "".join(parts)
+
+def select_list(sql: str):
+    """Items of the outermost SELECT list exactly as written, or None"""
+    depth, items, current, started = 0, [], [], False
+    for token in TOKEN_RE.findall(sql):
+        word = token.lower()
+        if token == '(':
+            depth += 1
+        elif token == ')':
+            depth -= 1
+        if depth == 0 and not started:
+            started = word == 'select'
+            continue
+        if depth == 0 and word in ('from', 'union'):
+            break
+        if depth == 0 and token == ',':
+            items.append("".join(current).strip())
+            current = []
+        elif started and not (depth == 0 and not "".join(current).strip() and word in ('distinct', 'all')):
+            current.append(token)
+    if current:
+        items.append("".join(current).strip())
+    return items or None
+
+def mysql_columns(sql: str):
+    """(label, expression) for each result column as MySQL names it: the alias,
+    the column name, or the expression as written. None when they can't be
+    worked out (e.g. ``*``)"""
+    import sqlglot
+    from sqlglot import exp
+
+    try:
+        tree = sqlglot.parse_one(sql, read='mysql')
+    except sqlglot.errors.SqlglotError:
+        return None
+    items = select_list(sql)
+    if not isinstance(tree, exp.Select) or items is None or len(items) != len(tree.expressions):
+        return None
+    columns = []
+    for expression, text in zip(tree.expressions, items):
+        if isinstance(expression, exp.Alias):
+            columns.append((expression.alias, expression.this))
+        elif isinstance(expression, exp.Column) and not isinstance(expression.this, exp.Star):
+            columns.append((expression.name, expression))
+        elif expression.find(exp.Star) and not expression.find(exp.Count):
+            return None
+        else:
+            columns.append((text, expression))
+    return columns
+
+def like_mysql(df, sql: str):
+    """Relabel a DuckDB result as MySQL would, with integral SUMs as integers
+    rather than DuckDB's HUGEINT floats"""
+    from sqlglot import exp
+
+    columns = mysql_columns(sql)
+    if not columns or len(columns) != df.shape[1]:
+        return df
+    df.columns = [label for label, _ in columns]
+    for i, (_, expression) in enumerate(columns):
+        series = df.iloc[:, i]
+        if isinstance(expression, exp.Sum) and pd.api.types.is_float_dtype(series):
+            values = series.dropna()
+            if (values % 1 == 0).all():
+                df.isetitem(i, series.astype('Int64' if series.isna().any() else 'int64'))
+    return df
+
+class InventoryReplica:
+    """Columnar snapshot of clothing_data held in an in-memory DuckDB.
+
+    A background thread probes the table version every ``refresh_interval``
+    seconds. When it changed, only the SKU and checksum of each row are read
+    and the rows whose checksum differs are fetched and upserted; the whole
+    table is reloaded only on the first load or when many rows changed.
+    ``query`` returns None whenever the replica can't answer, so callers fall
+    back to MySQL.
+    """
+
+    def __init__(self, db_manager, refresh_interval=300.0):
+        if duckdb is None:
+            raise ImportError("duckdb is required for the in-memory replica")
+        self.db_manager = db_manager
+        self.refresh_interval = refresh_interval
+        self._con = duckdb.connect()
+        # MySQL's default collation compares strings case-insensitively
+        self._con.execute("SET default_collation='nocase'")
+        self._version = None
+        self._ready = False
+        self._lock = threading.Lock()
+        self._thread = None
+        self.stats = {
+            'served': 0, 'fallbacks': 0, 'refreshes': 0, 'full_reloads': 0, 'upserted': 0, 'deleted': 0,
+            'rows': 0, 'refreshed_at': None
+        }
+
+    def refresh(self, force=False):
+        """Bring the snapshot up to date if clothing_data changed; returns True if it did.
+
+        ``force`` reloads the whole table.
+        """
+        version = self.db_manager._table_version()
+        if version is None or (version == self._version and not force):
+            return False
+
+        with self.db_manager.pool.connection() as connection:
+            if force or not self._ready:
+                self._reload(pd.read_sql(f"SELECT *, {ROW_CHECKSUM_SQL} AS _crc FROM clothing_data", connection))
+            else:
+                latest = pd.read_sql(f"SELECT SKU, {ROW_CHECKSUM_SQL} AS _crc FROM clothing_data", connection)
+                with self._lock:
+                    self._con.register('latest', latest)
+                    changed = self._con.execute(
+                        "SELECT l.SKU FROM latest l LEFT JOIN row_checksums r ON l.SKU = r.SKU "
+                        "WHERE r._crc IS DISTINCT FROM l._crc"
+                    ).df()['SKU'].tolist()
+                    removed = self._con.execute(
+                        "SELECT SKU FROM row_checksums WHERE SKU NOT IN (SELECT SKU FROM latest)"
+                    ).df()['SKU'].tolist()
+                    self._con.unregister('latest')
+                if len(changed) + len(removed) > FULL_RELOAD_FRACTION * max(len(latest), 1):
+                    self._reload(pd.read_sql(f"SELECT *, {ROW_CHECKSUM_SQL} AS _crc FROM clothing_data", connection))
+                else:
+                    self._upsert(self._fetch(connection, changed), changed + removed)
+                self.stats['rows'] = len(latest)
+        with self._lock:
+            self._version = version
+        self.stats['refreshes'] += 1
+        self.stats['refreshed_at'] = time.time()
+        return True
+
+    def _fetch(self, connection, skus):
+        """Current rows (with their checksums) for the given SKUs"""
+        placeholder = '?' if isinstance(connection, sqlite3.Connection) else '%s'
+        frames = []
+        for i in range(0, len(skus), FETCH_BATCH):
+            batch = skus[i:i + FETCH_BATCH]
+            frames.append(pd.read_sql(
+                f"SELECT *, {ROW_CHECKSUM_SQL} AS _crc FROM clothing_data "
+                f"WHERE SKU IN ({', '.join([placeholder] * len(batch))})",
+                connection, params=batch
+            ))
+        return pd.concat(frames, ignore_index=True) if frames else None
+
+    def _reload(self, snapshot):
+        with self._lock:
+            self._con.register('snapshot', snapshot)
+            self._con.execute("CREATE OR REPLACE TABLE clothing_data AS SELECT * EXCLUDE (_crc) FROM snapshot")
+            self._con.execute("CREATE OR REPLACE TABLE row_checksums AS SELECT SKU, _crc FROM snapshot")
+            self._con.unregister('snapshot')
+            self._ready = True
+        self.stats['full_reloads'] += 1
+        self.stats['rows'] = len(snapshot)
+
+    def _upsert(self, rows, stale):
+        """Replace the rows of ``stale`` SKUs with ``rows`` in one transaction"""
+        if not stale:
+            return
+        with self._lock:
+            self._con.register('stale', pd.DataFrame({'SKU': stale}))
+            if rows is not None:
+                self._con.register('fresh', rows)
+            self._con.execute("BEGIN TRANSACTION")
+            try:
+                self._con.execute("DELETE FROM clothing_data WHERE SKU IN (SELECT SKU FROM stale)")
+                self._con.execute("DELETE FROM row_checksums WHERE SKU IN (SELECT SKU FROM stale)")
+                if rows is not None:
+                    self._con.execute("INSERT INTO clothing_data BY NAME SELECT * EXCLUDE (_crc) FROM fresh")
+                    self._con.execute("INSERT INTO row_checksums SELECT SKU, _crc FROM fresh")
+                self._con.execute("COMMIT")
+            except duckdb.Error:
+                self._con.execute("ROLLBACK")
+                raise
+            finally:
+                self._con.unregister('stale')
+                if rows is not None:
+                    self._con.unregister('fresh')
+        self.stats['upserted'] += 0 if rows is None else len(rows)
+        self.stats['deleted'] += len(stale) - (0 if rows is None else len(rows))
+
+    def _refresh_loop(self):
+        while True:
+            try:
+                self.refresh()
+            except Exception:
+                pass  # keep serving the last snapshot; MySQL is still the fallback
+            time.sleep(self.refresh_interval)
+
+    def start(self):
+        """Load the first snapshot in the background and keep it fresh"""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._refresh_loop, name='replica-refresh', daemon=True)
+            self._thread.start()
+        return self
+
+    def query(self, sql: str):
+        """Result of a SELECT from the snapshot, or None to fall back to MySQL"""
+        if not self._ready or not sql.lstrip().lower().startswith(('select', 'with')):
+            self.stats['fallbacks'] += 1
+            return None
+        try:
+            with self._lock:
+                cursor = self._con.cursor()
+            df = cursor.execute(to_duckdb_sql(sql)).df()
+            cursor.close()
+        except duckdb.Error:
+            self.stats['fallbacks'] += 1
+            return None
+        self.stats['served'] += 1
+        return like_mysql(df, sql)
+
+    def check_parity(self, queries=None):
+        """Run queries on both engines; returns a list of (sql, problem) mismatches"""
+        self.refresh(force=True)
+        mismatches = []
+        for sql in queries or [example['SQLQuery'] for example in few_shot_prompts]:
+            try:
+                with self.db_manager.pool.connection() as connection:
+                    expected = pd.read_sql(sql, connection)
+            except Exception:
+                expected = None
+            actual = self.query(sql)
+            if expected is None or actual is None:
+                mismatches.append((sql, 'failed on ' + ('MySQL' if expected is None else 'replica')))
+                continue
+            problem = compare_frames(expected, actual, ordered='order by' in sql.lower())
+            if problem:
+                mismatches.append((sql, problem))
+        return mismatches
+
+def _sort_key(row):
+    return [f"{float(v):.6g}" if isinstance(v, (int, float)) or hasattr(v, 'as_tuple') else str(v).lower() for v in row]
+
+def _same(a, b):
+    if a is None or b is None or (isinstance(a, float) and math.isnan(a)) or (isinstance(b, float) and math.isnan(b)):
+        return pd.isna(a) and pd.isna(b)
+    if isinstance(a, (int, float)) or isinstance(b, (int, float)) or hasattr(a, 'as_tuple'):
+        try:
+            return math.isclose(float(a), float(b), rel_tol=1e-6, abs_tol=1e-6)
+        except (TypeError, ValueError):
+            return False
+    return str(a).lower() == str(b).lower()
+
+def compare_frames(expected, actual, ordered=True):
+    """Describe how two results differ by value, or None; column names aren't compared
+    since the engines label expressions differently"""
+    if expected.shape != actual.shape:
+        return f"shape {expected.shape} vs {actual.shape}"
+    rows_a = [tuple(row) for row in expected.itertuples(index=False)]
+    rows_b = [tuple(row) for row in actual.itertuples(index=False)]
+    if not ordered:
+        rows_a, rows_b = sorted(rows_a, key=_sort_key), sorted(rows_b, key=_sort_key)
+    for i, (row_a, row_b) in enumerate(zip(rows_a, rows_b)):
+        if not all(_same(a, b) for a, b in zip(row_a, row_b)):
+            if ordered and _same_numbers(expected, actual):
+                return None  # equal sort keys, ties broken differently
+            return f"row {i}: {row_a} vs {row_b}"
+    return None
+
+def _same_numbers(expected, actual):
+    """Numeric columns identical row for row, ignoring the text columns"""
+    numeric = [i for i in range(expected.shape[1]) if pd.api.types.is_numeric_dtype(actual.dtypes.iloc[i])]
+    if not numeric:
+        return False
+    return all(
+        _same(expected.iat[row, col], actual.iat[row, col])
+        for row in range(len(expected)) for col in numeric
+    )
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="In-memory replica of clothing_data")
+    parser.add_argument('--parity', action='store_true', help="check results match MySQL for the few-shot corpus")
+    args = parser.parse_args()
+    if args.parity:
+        from database import db_manager
+        mismatches = InventoryReplica(db_manager).check_parity()
+        for sql, problem in mismatches:
+            print(f"MISMATCH {problem}\n  {sql}")
+        print(f"{len(few_shot_prompts) - len(mismatches)}/{len(few_shot_prompts)} queries match")
+        raise SystemExit(1 if mismatches else 0)
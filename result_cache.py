@@ -0,0 +1,173 @@
+"""
+Result-set cache for DatabaseManager, keyed on canonicalized SQL
+"""
+
+import io
+import re
+import threading
+import time
+from collections import OrderedDict
+import pandas as pd
+
+# String literals, kept verbatim when canonicalizing
+LITERAL_RE = re.compile(r"'(?:[^']|'')*'|\"(?:[^\"]|\"\")*\"")
+NUMBER_RE = re.compile(r"\b\d+(?:\.\d+)?\b")
+WORD_RE = re.compile(r"\b[A-Za-z_]+\b")
+SELECT_LIST_END_RE = re.compile(r"[()]|\bfrom\b", re.IGNORECASE)
+
+# Keywords and functions are case-folded after the select list; identifiers
+# keep their case since aliases end up as result column names
+KEYWORDS = {
+    'select', 'from', 'where', 'and', 'or', 'not', 'group', 'by', 'order', 'limit',
+    'offset', 'as', 'asc', 'desc', 'distinct', 'sum', 'count', 'avg', 'min', 'max',
+    'in', 'like', 'between', 'case', 'when', 'then', 'else', 'end', 'having', 'is',
+    'null', 'join', 'inner', 'left', 'right', 'outer', 'on', 'union', 'all'
+}
+
+# Checksum of clothing_data over every column: changes whenever any row is
+# added, removed or updated. Row CRCs are summed rather than XORed, since CRC32
+# is linear over XOR and swapping a value between two rows would cancel out.
+ROW_CHECKSUM_SQL = "CRC32(CONCAT_WS('|', SKU, Brand, Category, Color, Size, Price_INR, Stock, Material, Gender))"
+TABLE_VERSION_SQL = f"SELECT COUNT(*), SUM({ROW_CHECKSUM_SQL}) FROM clothing_data"
+
+def _normalize_number(match):
+    value = float(match.group())
+    return str(int(value)) if value.is_integer() else repr(value)
+
+def _select_list_end(sql):
+    """Position of the top-level FROM, or the end of the query"""
+    depth = 0
+    last = 0
+    for match in [*LITERAL_RE.finditer(sql), None]:
+        end = match.start() if match else len(sql)
+        for token in SELECT_LIST_END_RE.finditer(sql, last, end):
+            if token.group() == '(':
+                depth += 1
+            elif token.group() == ')':
+                depth -= 1
+            elif depth == 0:
+                return token.start()
+        last = match.end() if match else len(sql)
+    return len(sql)
+
+def canonicalize_sql(sql: str):
+    """Fold case, whitespace, quoting and number formatting so equivalent queries share a key.
+
+    The select list is kept as written: MySQL labels unaliased columns with
+    their text, so ``SUM(Stock)`` and ``sum(Stock)`` return different columns.
+    """
+    end = _select_list_end(sql)
+    parts = [sql[:end].strip(), " "]
+    last = end
+    for match in LITERAL_RE.finditer(sql, end):
+        parts.append(_canonical_code(sql[last:match.start()]))
+        literal = match.group()
+        if literal.startswith('"'):
+            literal = "'" + literal[1:-1].replace('""', '"').replace("'", "''") + "'"
+        parts.append(literal)
+        last = match.end()
+    parts.append(_canonical_code(sql[last:]))
+    return "".join(parts).strip().rstrip(';').strip()
+
+def _canonical_code(code):
+    code = " ".join(code.split())
+    code = WORD_RE.sub(lambda m: m.group().lower() if m.group().lower() in KEYWORDS else m.group(), code)
+    code = re.sub(r"\s*([(),=<>*+/-])\s*", r"\1", code)
+    return NUMBER_RE.sub(_normalize_number, code)
+
+def to_bytes(df):
+    buffer = io.BytesIO()
+    df.to_parquet(buffer)
+    return buffer.getvalue()
+
+def from_bytes(data):
+    return pd.read_parquet(io.BytesIO(data))
+
+class ResultCache:
+    """LRU cache of query results stored as Parquet bytes under a memory cap.
+
+    ``probe`` is a callable returning the current table version; it's run at
+    most every ``probe_interval`` seconds and the whole cache is dropped when
+    its value changes.
+    """
+
+    def __init__(self, max_bytes=64 * 1024 * 1024, probe=None, probe_interval=30.0):
+        self.max_bytes = max_bytes
+        self.probe = probe
+        self.probe_interval = probe_interval
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._version = None
+        self._probed_at = 0.0
+        self.stats = {
+            'hits': 0, 'misses': 0, 'evictions': 0, 'invalidations': 0,
+            'db_seconds_saved': 0.0
+        }
+
+    def _check_version(self):
+        """Run the probe if it's due; lookups never wait on it behind the lock"""
+        with self._lock:
+            if self.probe is None or time.monotonic() - self._probed_at < self.probe_interval:
+                return
+            # Claim this interval so concurrent lookups don't probe too
+            self._probed_at = time.monotonic()
+        version = self.probe()
+        with self._lock:
+            if version is not None and version != self._version:
+                if self._entries:
+                    self.stats['invalidations'] += 1
+                self._entries.clear()
+                self._bytes = 0
+                self._version = version
+
+    def get(self, sql: str):
+        """Cached DataFrame for the query, or None"""
+        key = canonicalize_sql(sql)
+        self._check_version()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.stats['misses'] += 1
+                return None
+            self._entries.move_to_end(key)
+            self.stats['hits'] += 1
+            self.stats['db_seconds_saved'] += entry[1]
+            data = entry[0]
+        return from_bytes(data)
+
+    def put(self, sql: str, df, elapsed: float = 0.0):
+        """Store a result; ``elapsed`` is what the query cost the database"""
+        try:
+            data = to_bytes(df)
+        except (ValueError, TypeError, ImportError):
+            # Duplicate column names or types Parquet can't hold
+            return
+        if len(data) > self.max_bytes:
+            return
+
+        key = canonicalize_sql(sql)
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= len(old[0])
+            self._entries[key] = (data, elapsed)
+            self._bytes += len(data)
+            while self._bytes > self.max_bytes:
+                _, (evicted, _) = self._entries.popitem(last=False)
+                self._bytes -= len(evicted)
+                self.stats['evictions'] += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def metrics(self):
+        with self._lock:
+            metrics = dict(self.stats)
+            metrics['entries'] = len(self._entries)
+            metrics['bytes'] = self._bytes
+        lookups = metrics['hits'] + metrics['misses']
+        metrics['hit_rate'] = metrics['hits'] / lookups if lookups else 0.0
+        return metrics
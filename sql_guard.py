@@ -0,0 +1,231 @@
+"""
+Local validation of generated SQL against the clothing_data schema, run before
+anything reaches MySQL
+"""
+
+import threading
+import time
+
+# Table -> columns, as described to the model in prompt_builder.PREFIX
+SCHEMA = {
+    'clothing_data': ('SKU', 'Brand', 'Category', 'Color', 'Size', 'Price_INR', 'Stock', 'Material', 'Gender'),
+}
+
+# Columns whose leading-wildcard LIKEs can be expanded from their distinct values
+LOOKUP_COLUMNS = ('Brand', 'Category', 'Color', 'Size', 'Gender', 'Material')
+MAX_IN_VALUES = 50
+
+def _allowed_functions():
+    """sqlglot expression types of the functions a report query may call:
+    aggregates and ranking plus common string, math and date functions. Anything
+    else (LOAD_FILE, SLEEP, BENCHMARK, VERSION, ...) is rejected."""
+    from sqlglot import exp
+
+    return (
+        exp.AggFunc, exp.RowNumber, exp.Rank, exp.DenseRank, exp.Connector,
+        exp.Case, exp.If, exp.Cast, exp.Coalesce, exp.Nullif, exp.Greatest, exp.Least,
+        exp.Lower, exp.Upper, exp.Concat, exp.ConcatWs, exp.Substring, exp.Left, exp.Right,
+        exp.Trim, exp.Length, exp.Replace, exp.StrPosition, exp.Pad,
+        exp.Round, exp.Trunc, exp.Abs, exp.Floor, exp.Ceil, exp.Pow, exp.Sqrt, exp.Ln, exp.Exp, exp.Sign,
+        exp.NumberToStr, exp.Year, exp.Quarter, exp.Month, exp.Week, exp.Day, exp.Hour, exp.Extract,
+        exp.CurrentDate, exp.CurrentTimestamp, exp.DateAdd, exp.DateSub, exp.DateDiff,
+        exp.StrToDate, exp.TimeToStr, exp.TsOrDsToDate, exp.TsOrDsToTimestamp,
+    )
+
+# Functions sqlglot has no expression type for in the MySQL dialect
+ALLOWED_ANONYMOUS = {'NOW', 'DAYNAME', 'MONTHNAME'}
+
+class SQLValidationError(ValueError):
+    """Generated SQL that must not be sent to the database; the message is fed back to the LLM"""
+
+class SQLGuard:
+    """Parses generated SQL with sqlglot and only lets safe, bounded SELECTs through.
+
+    Rejects anything that isn't a single SELECT over known tables and
+    columns, or that calls a function outside the allowlist. Rewrites
+    ``SELECT *`` to the schema's columns, leading-wildcard LIKEs on lookup
+    columns to ``IN`` lists of the matching values, and adds
+    ``LIMIT max_rows + 1`` to row-returning queries (one more row than the
+    stream keeps, so truncation is still detected). With ``explain`` and
+    ``max_estimated_rows`` set, plans estimated above the threshold are
+    rejected. Unchanged queries are returned exactly as written.
+    """
+
+    def __init__(self, schema=SCHEMA, max_rows=100000, load_vocabulary=None, explain=None,
+                 max_estimated_rows=0, vocabulary_ttl=300.0):
+        self.schema = {table.lower(): {column.lower(): column for column in columns} for table, columns in schema.items()}
+        self.max_rows = max_rows
+        self.load_vocabulary = load_vocabulary
+        self.explain = explain
+        self.max_estimated_rows = max_estimated_rows
+        self.vocabulary_ttl = vocabulary_ttl
+        self._vocabulary = None
+        self._vocabulary_at = 0.0
+        self._lock = threading.Lock()
+        self.stats = {'checked': 0, 'rejected': 0, 'rewritten': 0}
+
+    def check(self, sql: str):
+        """Return the SQL to run (possibly rewritten), or raise SQLValidationError"""
+        # sqlglot is only imported once the first query needs checking
+        import sqlglot
+        from sqlglot import exp
+
+        self.stats['checked'] += 1
+        try:
+            statements = [s for s in sqlglot.parse(sql, read='mysql') if s is not None]
+        except sqlglot.errors.SqlglotError as e:
+            self._reject(f"SQL does not parse: {str(e).splitlines()[0]}")
+        if len(statements) != 1:
+            self._reject("Return exactly one SQL statement")
+        tree = statements[0]
+
+        if not isinstance(tree, exp.Query) or any(
+            isinstance(node, (exp.DML, exp.DDL, exp.Command, exp.Into)) for node in tree.walk()
+        ):
+            self._reject("Only SELECT statements are allowed")
+        self._check_functions(tree)
+        self._check_names(tree)
+
+        changed = self._expand_star(tree) | self._rewrite_like(tree) | self._add_limit(tree)
+        guarded = tree.sql(dialect='mysql') if changed else sql.strip()
+        if changed:
+            self.stats['rewritten'] += 1
+
+        if self.explain and self.max_estimated_rows:
+            estimate = self.explain(guarded)
+            if estimate is not None and estimate > self.max_estimated_rows:
+                self._reject(f"Query would examine about {estimate:,} rows "
+                             f"(limit {self.max_estimated_rows:,}); add filters or aggregate")
+        return guarded
+
+    def _reject(self, message):
+        self.stats['rejected'] += 1
+        raise SQLValidationError(message)
+
+    def _check_functions(self, tree):
+        from sqlglot import exp
+
+        if tree.find(exp.SessionParameter, exp.Parameter):
+            self._reject("Server and user variables (@@name, @name) are not allowed")
+        allowed = _allowed_functions()
+        for function in tree.find_all(exp.Func):
+            if isinstance(function, exp.Anonymous):
+                if function.name.upper() not in ALLOWED_ANONYMOUS:
+                    self._reject(f"Function '{function.name.upper()}' is not allowed")
+            elif not isinstance(function, allowed):
+                self._reject(f"Function '{function.sql_name()}' is not allowed")
+
+    def _check_names(self, tree):
+        from sqlglot import exp
+
+        ctes = {cte.alias_or_name.lower() for cte in tree.find_all(exp.CTE)}
+        sources = {alias.lower() for alias in (node.alias for node in tree.find_all(exp.Table, exp.Subquery)) if alias}
+        for table in tree.find_all(exp.Table):
+            if table.name.lower() not in self.schema and table.name.lower() not in ctes:
+                self._reject(f"Unknown table '{table.name}'. The only table is clothing_data")
+
+        known = {column for columns in self.schema.values() for column in columns}
+        aliases = {alias.alias.lower() for alias in tree.find_all(exp.Alias)}
+        for column in tree.find_all(exp.Column):
+            if isinstance(column.this, exp.Star):
+                continue
+            name = column.name.lower()
+            qualifier = column.table.lower()
+            if qualifier and qualifier not in self.schema and qualifier not in ctes | sources:
+                self._reject(f"Unknown table or alias '{column.table}'")
+            if name not in known and name not in aliases and not ctes:
+                columns = ", ".join(self.schema['clothing_data'].values())
+                self._reject(f"Unknown column '{column.name}'. Available columns: {columns}")
+
+    def _expand_star(self, tree):
+        """SELECT * over a schema table -> its explicit column list"""
+        from sqlglot import exp
+
+        changed = False
+        for select in tree.find_all(exp.Select):
+            tables = [table for table in select.find_all(exp.Table) if table.parent_select is select]
+            if len(tables) != 1 or tables[0].name.lower() not in self.schema:
+                continue
+            if not any(isinstance(e, exp.Star) for e in select.expressions):
+                continue
+            expanded = []
+            for expression in select.expressions:
+                if isinstance(expression, exp.Star):
+                    expanded.extend(exp.column(column) for column in self.schema[tables[0].name.lower()].values())
+                else:
+                    expanded.append(expression)
+            select.set('expressions', expanded)
+            changed = True
+        return changed
+
+    def _vocabulary_for(self, column):
+        if self.load_vocabulary is None:
+            return None
+        with self._lock:
+            # Also after a failed load, so an unreachable DB isn't asked on every query
+            if time.time() - self._vocabulary_at > self.vocabulary_ttl:
+                self._vocabulary_at = time.time()
+                vocabulary = self.load_vocabulary() or {}
+                if vocabulary:
+                    self._vocabulary = {key.lower(): [str(v) for v in values] for key, values in vocabulary.items()}
+            return (self._vocabulary or {}).get(column.lower())
+
+    def _rewrite_like(self, tree):
+        """col LIKE '%x%' / '%x' on a lookup column -> col IN (values matching it).
+
+        A leading wildcard can't use an index; the distinct values are few,
+        so the same rows can be picked out by equality instead.
+        """
+        from sqlglot import exp
+
+        lookup = {column.lower() for column in LOOKUP_COLUMNS}
+        changed = False
+        for like in list(tree.find_all(exp.Like)):
+            column, pattern = like.this, like.expression
+            if not (isinstance(column, exp.Column) and column.name.lower() in lookup
+                    and isinstance(pattern, exp.Literal) and pattern.is_string):
+                continue
+            text = pattern.this
+            if not text.startswith('%') or '_' in text or '\\' in text:
+                continue
+            needle = text.strip('%')
+            if not needle or '%' in needle:
+                continue
+            values = self._vocabulary_for(column.name)
+            if not values:
+                continue
+            needle = needle.lower()
+            if text.endswith('%'):
+                matches = [v for v in values if needle in v.lower()]
+            else:
+                matches = [v for v in values if v.lower().endswith(needle)]
+            if not matches or len(matches) > MAX_IN_VALUES:
+                continue
+            replacement = exp.In(this=column.copy(), expressions=[exp.Literal.string(v) for v in sorted(matches)])
+            like.replace(exp.Not(this=replacement) if like.args.get('negate') else replacement)
+            changed = True
+        return changed
+
+    def _add_limit(self, tree):
+        """Bound row-returning queries; single-row aggregates are left alone"""
+        from sqlglot import exp
+
+        cap = self.max_rows + 1
+        limit = tree.args.get('limit')
+        if limit is not None:
+            value = limit.expression
+            if isinstance(value, exp.Literal) and not value.is_string and int(value.this) > cap:
+                limit.set('expression', exp.Literal.number(cap))
+                return True
+            return False
+        if isinstance(tree, exp.Select) and not tree.args.get('group') and tree.expressions and all(
+            expression.find(exp.AggFunc) for expression in tree.expressions
+        ):
+            return False
+        tree.set('limit', exp.Limit(expression=exp.Literal.number(cap)))
+        return True
+
+def explain_rows(sql: str):
+    """MySQL's estimate of rows examined for a query, or None when unavailable"""
+    from database import db_manager
+    return db_manager.estimate_rows(sql)
@@ -0,0 +1,26 @@
+import os
+import sys
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from database import DatabaseManager, sqlite_connector  # noqa: E402
+
+@pytest.fixture
+def clothing_db(tmp_path):
+    """Factory: ``clothing_db(rows)`` -> (sqlite connection, DatabaseManager) over
+    a clothing_data table in a temporary SQLite file"""
+    connections = []
+
+    def create(rows):
+        path = str(tmp_path / f'clothing{len(connections)}.db')
+        connection = sqlite_connector(path)()
+        connection.execute("CREATE TABLE clothing_data (SKU TEXT PRIMARY KEY, Brand TEXT, Category TEXT, Color TEXT, "
+                           "Size TEXT, Price_INR INTEGER, Stock INTEGER, Material TEXT, Gender TEXT)")
+        connection.executemany("INSERT INTO clothing_data VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+        connection.commit()
+        connections.append(connection)
+        return connection, DatabaseManager(connect=sqlite_connector(path))
+
+    yield create
+    for connection in connections:
+        connection.close()
@@ -0,0 +1,17 @@
+import io
+from batch import dedupe, read_questions
+
+def test_jsonl_problems_are_reported_per_line():
+    upload = io.BytesIO(b'{"question": "How many Nike shirts?"}\n'
+                        b'{"q": "missing key"}\n'
+                        b'\n'
+                        b'not json\n'
+                        b'"Total inventory value?"\n')
+    problems = []
+    assert read_questions(upload, 'questions.jsonl', problems) == ["How many Nike shirts?", "Total inventory value?"]
+    assert [number for number, _ in problems] == [2, 4]
+    assert "no 'question' key" in problems[0][1]
+
+def test_csv_question_column_and_dedupe():
+    upload = io.BytesIO(b"id,question\n1,How many Nike shirts?\n2,how many nike shirts\n3,Zara total inventory?\n")
+    assert dedupe(read_questions(upload, 'questions.csv')) == ["How many Nike shirts?", "Zara total inventory?"]
@@ -0,0 +1,23 @@
+import os
+import pandas as pd
+from chat_history import ChatHistory
+
+def test_small_results_stay_loadable_past_the_cap(tmp_path):
+    history = ChatHistory(str(tmp_path), preview_rows=20, max_bytes=1)
+    small = pd.DataFrame({'Brand': ['Nike', 'Puma'], 'total': [5, 7]})
+    first = history.add_assistant("✅ Query executed!", small, 'bar_chart', "SELECT ...", figure='{"data": []}')
+    history.add_assistant("✅ Query executed!", small.copy())
+
+    assert first['preview'] is None and first['figure'] is None
+    assert first['result_path']
+    assert history.load_result(first).equals(small)
+
+def test_large_results_are_spilled_and_previewed(tmp_path):
+    history = ChatHistory(str(tmp_path), preview_rows=5)
+    large = pd.DataFrame({'SKU': [f"SKU{i}" for i in range(50)], 'Stock': range(50)})
+    message = history.add_assistant("✅ Query executed!", large)
+
+    assert len(message['preview']) == 5 and message['rows'] == 50
+    assert history.load_result(message).equals(large)
+    history.clear()
+    assert not os.path.exists(history.spill_dir)
@@ -0,0 +1,57 @@
+import threading
+
+import pytest
+from database import ConnectionPool, PoolTimeout, sqlite_connector
+
+@pytest.fixture
+def pool(tmp_path):
+    return ConnectionPool(sqlite_connector(str(tmp_path / 'pool.db')), size=2, timeout=0.1)
+
+def test_checkout_times_out_when_every_slot_is_busy(pool):
+    with pool.connection(), pool.connection():
+        with pytest.raises(PoolTimeout):
+            with pool.connection():
+                pass
+    assert pool.stats()['timeouts'] == 1
+
+    # The slots are free again afterwards
+    with pool.connection() as connection:
+        assert connection.execute('SELECT 1').fetchone() == (1,)
+
+def test_waiting_checkout_gets_the_released_connection(pool):
+    pool.timeout = 2.0
+    held, released = threading.Event(), threading.Event()
+
+    def hold():
+        with pool.connection(), pool.connection():
+            held.set()
+            released.wait()
+
+    holder = threading.Thread(target=hold)
+    holder.start()
+    held.wait()
+    threading.Timer(0.1, released.set).start()
+    with pool.connection() as connection:
+        assert connection.execute('SELECT 1').fetchone() == (1,)
+    holder.join()
+    assert pool.stats()['wait_max_s'] > 0
+
+def test_stale_idle_connection_is_replaced(pool):
+    with pool.connection() as connection:
+        connection.close()  # e.g. dropped by the server while idle
+
+    with pool.connection() as fresh:
+        assert fresh is not connection
+        assert fresh.execute('SELECT 1').fetchone() == (1,)
+    stats = pool.stats()
+    assert stats['discarded'] == 1 and stats['created'] == 2
+
+def test_stats_count_checkouts(pool):
+    for _ in range(3):
+        with pool.connection():
+            assert pool.stats()['in_use'] == 1
+    stats = pool.stats()
+    assert stats['checkouts'] == 3
+    assert stats['created'] == 1  # the idle connection is reused
+    assert stats['in_use'] == 0 and stats['idle'] == 1 and stats['size'] == 2
+    assert stats['timeouts'] == 0 and stats['wait_avg_s'] == stats['wait_total_s'] / 3
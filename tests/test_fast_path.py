@@ -0,0 +1,103 @@
+import pytest
+from fast_path import FastPath
+
+VOCABULARY = {
+    'Brand': ['Nike', 'Puma', 'Levis'],
+    'Category': ['Shirt', 'T-Shirt', 'Jacket'],
+    'Color': ['White', 'Red'],
+    'Size': ['XS', 'S', 'M', 'L', 'XL'],
+    'Gender': ['Men', 'Women', 'Unisex'],
+    'Material': ['Cotton', 'Denim'],
+}
+
+@pytest.fixture
+def fast_path():
+    return FastPath(lambda: VOCABULARY)
+
+@pytest.mark.parametrize('question, sql', [
+    ("Nike shirts with stock under 10",
+     "SELECT SUM(Stock) FROM clothing_data WHERE Brand = 'Nike' AND Category = 'Shirt' AND Stock < 10;"),
+    ("Nike shirts over 1000 in stock",
+     "SELECT SUM(Stock) FROM clothing_data WHERE Brand = 'Nike' AND Category = 'Shirt' AND Stock > 1000;"),
+    ("How many Nike shirts priced under 2000?",
+     "SELECT SUM(Stock) FROM clothing_data WHERE Brand = 'Nike' AND Category = 'Shirt' AND Price_INR < 2000;"),
+    ("Nike shirts cheaper than 500",
+     "SELECT SUM(Stock) FROM clothing_data WHERE Brand = 'Nike' AND Category = 'Shirt' AND Price_INR < 500;"),
+    ("Puma jackets with price above 3000 and stock below 5",
+     "SELECT SUM(Stock) FROM clothing_data WHERE Brand = 'Puma' AND Category = 'Jacket' AND Price_INR > 3000 AND Stock < 5;"),
+])
+def test_number_binds_to_its_measure(fast_path, question, sql):
+    assert fast_path.parse(question) == (sql, 'number')
+
+@pytest.mark.parametrize('question', [
+    "Nike shirts under 1000",
+    "Nike shirts over 10",
+    "Nike shirts with stock over 1000 rupees",
+])
+def test_number_without_clear_measure_is_not_parsed(fast_path, question):
+    assert fast_path.parse(question) is None
+
+@pytest.mark.parametrize('question', [
+    "Total products in the store?",
+    "how many products in store",
+    "number of products",
+    "count of items",
+])
+def test_unfiltered_product_count_is_left_to_the_llm(fast_path, question):
+    assert fast_path.parse(question) is None
+
+@pytest.mark.parametrize('question', ["total stock", "total inventory", "how many products are in stock"])
+def test_unfiltered_stock_is_summed(fast_path, question):
+    assert fast_path.parse(question) == ("SELECT SUM(Stock) FROM clothing_data;", 'number')
+
+def test_average_uses_its_subject(fast_path):
+    assert fast_path.parse("average stock of Nike shirts") == (
+        "SELECT AVG(Stock) FROM clothing_data WHERE Brand = 'Nike' AND Category = 'Shirt';", 'number')
+    assert fast_path.parse("average price of Nike shirts with stock under 10") == (
+        "SELECT AVG(Price_INR) FROM clothing_data WHERE Brand = 'Nike' AND Category = 'Shirt' AND Stock < 10;", 'number')
+    assert fast_path.parse("average of Nike shirts") is None
+
+def test_price_without_average_is_not_a_sum(fast_path):
+    assert fast_path.parse("price of Nike shirts") is None
+
+@pytest.mark.parametrize('question, sql', [
+    ("How many S Nike shirts",
+     "SELECT SUM(Stock) FROM clothing_data WHERE Size = 'S' AND Brand = 'Nike' AND Category = 'Shirt';"),
+    ("Nike shirts in S",
+     "SELECT SUM(Stock) FROM clothing_data WHERE Brand = 'Nike' AND Category = 'Shirt' AND Size = 'S';"),
+])
+def test_stopword_values_are_kept(fast_path, question, sql):
+    assert fast_path.parse(question) == (sql, 'number')
+
+def test_multi_word_values_and_grouping(fast_path):
+    assert fast_path.parse("White Nike t-shirts count") == (
+        "SELECT SUM(Stock) FROM clothing_data WHERE Color = 'White' AND Brand = 'Nike' AND Category = 'T-Shirt';", 'number')
+    assert fast_path.parse("top 3 brands by stock for women") == (
+        "SELECT Brand, SUM(Stock) as total FROM clothing_data WHERE Gender = 'Women' GROUP BY Brand ORDER BY total DESC LIMIT 3;",
+        'bar_chart')
+    assert fast_path.parse("most expensive brand by average price") == (
+        "SELECT Brand, AVG(Price_INR) as avg FROM clothing_data GROUP BY Brand ORDER BY avg DESC LIMIT 1;", 'bar_chart')
+
+def test_unknown_words_are_not_guessed(fast_path):
+    assert fast_path.parse("Nike shirts returned last week") is None
+    assert fast_path.stats['misses'] == 1
+
+def test_vocabulary_load_backs_off_while_the_db_is_down():
+    calls = []
+
+    def unavailable():
+        calls.append(1)
+        return {}
+
+    fast_path = FastPath(unavailable, retry_interval=60)
+    assert fast_path.parse("How many Nike shirts") is None
+    assert fast_path.parse("How many Puma shirts") is None
+    assert len(calls) == 1
+
+def test_load_vocabulary_swallows_db_errors(tmp_path):
+    from database import DatabaseManager, sqlite_connector
+    from fast_path import load_vocabulary
+
+    # No clothing_data table: every DISTINCT query fails
+    db_manager = DatabaseManager(connect=sqlite_connector(str(tmp_path / 'empty.db')))
+    assert load_vocabulary(db_manager) == {}
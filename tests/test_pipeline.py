@@ -0,0 +1,89 @@
+import asyncio
+import threading
+import time
+import pandas as pd
+from pipeline import Pipeline
+
+class FakeLLM:
+    def __init__(self, sql_query="SELECT Brand FROM clothing_data", delay=0.0):
+        self.sql_query = sql_query
+        self.delay = delay
+        self.remembered = []
+
+    async def agenerate_sql(self, question, on_token=None):
+        await asyncio.sleep(self.delay)
+        return self.sql_query, 'table'
+
+    def remember(self, question, sql_query, viz_type):
+        self.remembered.append(question)
+
+class SlowStream:
+    """Blocks in the driver for ``delay`` seconds, like a long-running MySQL query"""
+
+    def __init__(self, delay):
+        self.delay = delay
+        self.cancelled = False
+        self.error = None
+        self.chunks = []
+        self.finished = threading.Event()
+
+    def __iter__(self):
+        time.sleep(self.delay)
+        self.finished.set()
+        if not self.cancelled:
+            self.chunks.append(pd.DataFrame({'Brand': ['Nike']}))
+            yield self.chunks[-1]
+
+    def cancel(self):
+        self.cancelled = True
+
+    def frame(self):
+        return self.chunks[0] if self.chunks else None
+
+class FakeDB:
+    def __init__(self, delay):
+        self.stream = SlowStream(delay)
+        self.timeout = None
+
+    def execute_query_stream(self, sql_query, timeout=None):
+        self.timeout = timeout
+        return self.stream
+
+def timed_run(pipeline, question):
+    start = time.perf_counter()
+    turn = asyncio.run(pipeline.run(question))
+    return turn, time.perf_counter() - start
+
+def test_db_timeout_bounds_the_turn():
+    db, llm = FakeDB(delay=3.0), FakeLLM()
+    pipeline = Pipeline(llm, db, lambda question: "web", db_timeout=0.3)
+    turn, elapsed = timed_run(pipeline, "Show all Nike brands")
+
+    assert turn['error'] == "Query timed out after 0.3s"
+    assert elapsed < 1.5
+    assert db.timeout == 0.3  # passed on as the server-side limit
+    assert db.stream.cancelled
+    assert llm.remembered == []
+
+def test_in_flight_web_search_does_not_hold_the_turn():
+    searching = threading.Event()
+
+    def slow_search(question):
+        searching.set()
+        time.sleep(3.0)
+        return "web"
+
+    # Out-of-domain question: the search starts alongside SQL generation
+    pipeline = Pipeline(FakeLLM(delay=0.2), FakeDB(delay=0.0), slow_search, web_timeout=5)
+    turn, elapsed = timed_run(pipeline, "Who founded the company?")
+
+    assert searching.is_set()
+    assert turn['result_df'] is not None and turn['error'] is None
+    assert elapsed < 1.5
+
+def test_web_timeout_bounds_the_fallback():
+    pipeline = Pipeline(FakeLLM(sql_query=None), FakeDB(delay=0.0), lambda question: time.sleep(3.0), web_timeout=0.3)
+    turn, elapsed = timed_run(pipeline, "Who founded the company?")
+
+    assert turn['web_result'] == "Web search timed out after 0.3s"
+    assert elapsed < 1.5
@@ -0,0 +1,25 @@
+import os
+import subprocess
+import sys
+from few_shot_prompts import few_shot_prompts
+from prompt_builder import PromptBuilder, count_tokens
+
+def test_examples_fit_the_budget():
+    builder = PromptBuilder(token_budget=400)
+    prompt, info = builder.build("How many Nike shirts?", few_shot_prompts)
+    assert 0 < info['examples'] < len(few_shot_prompts)
+    assert not info['over_budget']
+    assert info['estimated_prompt_tokens'] <= 400
+    assert count_tokens(prompt) <= 400 + info['examples']  # pieces are counted separately
+
+def test_question_over_budget_is_flagged():
+    builder = PromptBuilder(token_budget=PromptBuilder().prefix_tokens + 5)
+    prompt, info = builder.build("How many Nike shirts " * 20, few_shot_prompts)
+    assert info['examples'] == 0
+    assert info['over_budget']
+    assert prompt.endswith("SQL:")
+
+def test_tokenizer_is_not_loaded_on_import():
+    check = "import prompt_builder; assert prompt_builder._load_tokenizer.cache_info().misses == 0"
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    subprocess.run([sys.executable, '-c', check], cwd=root, check=True)
@@ -0,0 +1,65 @@
+import random
+import pandas as pd
+import pytest
+from few_shot_prompts import few_shot_prompts
+
+duckdb = pytest.importorskip('duckdb')
+from replica import InventoryReplica, compare_frames, mysql_columns  # noqa: E402
+
+BRANDS = ['Nike', 'Adidas', 'Puma', 'Levis', 'Zara', 'Gucci', 'Versace']
+CATEGORIES = ['Shirt', 'T-Shirt', 'Jeans', 'Shoes', 'Blazer', 'Jacket', 'Socks', 'Joggers', 'Backpack']
+COLORS = ['White', 'Black', 'Red', 'Blue', 'Green']
+SIZES = ['XS', 'S', 'M', 'L', 'XL', 'XXL']
+MATERIALS = ['Cotton', 'Denim', 'Leather', 'Wool', 'Synthetic']
+GENDERS = ['Men', 'Women', 'Unisex']
+
+@pytest.fixture
+def db(clothing_db):
+    rng = random.Random(0)
+    rows = [
+        (f"SKU{i:05d}", rng.choice(BRANDS), rng.choice(CATEGORIES), rng.choice(COLORS), rng.choice(SIZES),
+         rng.randrange(500, 20000), rng.randrange(0, 200), rng.choice(MATERIALS), rng.choice(GENDERS))
+        for i in range(2000)
+    ]
+    connection, db_manager = clothing_db(rows)
+    replica = InventoryReplica(db_manager)
+    replica.refresh()
+    return connection, replica
+
+def source(connection, sql):
+    return pd.read_sql(sql, connection)
+
+def test_parity_with_source_on_few_shot_corpus(db):
+    connection, replica = db
+    for example in few_shot_prompts:
+        sql = example['SQLQuery']
+        expected, actual = source(connection, sql), replica.query(sql)
+        assert actual is not None, sql
+        assert compare_frames(expected, actual, ordered='order by' in sql.lower()) is None, sql
+        assert list(actual.columns) == list(expected.columns), sql
+
+def test_sums_come_back_as_integers(db):
+    _, replica = db
+    df = replica.query("SELECT Brand, SUM(Stock) FROM clothing_data GROUP BY Brand")
+    assert list(df.columns) == ['Brand', 'SUM(Stock)']
+    assert pd.api.types.is_integer_dtype(df['SUM(Stock)'])
+
+def test_refresh_upserts_only_changed_rows(db):
+    connection, replica = db
+    connection.execute("UPDATE clothing_data SET Brand = 'Prada' WHERE SKU = 'SKU00001'")
+    connection.execute("DELETE FROM clothing_data WHERE SKU = 'SKU00002'")
+    connection.execute("INSERT INTO clothing_data VALUES ('NEW1', 'Nike', 'Shirt', 'Red', 'S', 999, 3, 'Cotton', 'Men')")
+    connection.commit()
+
+    assert replica.refresh()
+    assert replica.stats['full_reloads'] == 1
+    assert (replica.stats['upserted'], replica.stats['deleted']) == (2, 1)
+    sql = "SELECT SKU, Brand, Stock FROM clothing_data ORDER BY SKU"
+    assert compare_frames(source(connection, sql), replica.query(sql)) is None
+    assert not replica.refresh()
+
+def test_labels_follow_mysql():
+    assert [label for label, _ in mysql_columns(
+        "SELECT t.Brand, SUM(Price_INR * Stock), COUNT(*) as n FROM clothing_data t GROUP BY t.Brand"
+    )] == ['Brand', 'SUM(Price_INR * Stock)', 'n']
+    assert mysql_columns("SELECT * FROM clothing_data") is None
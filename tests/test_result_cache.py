@@ -0,0 +1,53 @@
+import threading
+import time
+import pytest
+from result_cache import ResultCache, canonicalize_sql
+
+ROWS = [
+    ('A1', 'Nike', 'Shirt', 'Red', 'S', 1000, 5, 'Cotton', 'Men'),
+    ('B2', 'Puma', 'Shirt', 'Red', 'S', 1000, 7, 'Cotton', 'Men'),
+]
+
+@pytest.fixture
+def db(clothing_db):
+    return clothing_db(ROWS)
+
+@pytest.mark.parametrize('update', [
+    ["UPDATE clothing_data SET Brand = 'Zara' WHERE SKU = 'A1'"],
+    ["UPDATE clothing_data SET Material = 'Linen' WHERE SKU = 'B2'"],
+    # Stock moved between rows leaves COUNT and SUM(Stock) unchanged
+    ["UPDATE clothing_data SET Stock = Stock + 2 WHERE SKU = 'A1'",
+     "UPDATE clothing_data SET Stock = Stock - 2 WHERE SKU = 'B2'"],
+])
+def test_table_version_changes_on_any_update(db, update):
+    connection, db_manager = db
+    before = db_manager._table_version()
+    for statement in update:
+        connection.execute(statement)
+    connection.commit()
+    assert db_manager._table_version() != before
+
+def test_probe_runs_outside_the_lock():
+    cache = ResultCache(probe=lambda: time.sleep(0.3) or 1, probe_interval=0)
+    lookup = threading.Thread(target=cache.get, args=("SELECT 1",))
+    lookup.start()
+    time.sleep(0.1)
+    assert cache._lock.acquire(timeout=0.05)
+    cache._lock.release()
+    lookup.join()
+
+def test_equivalent_queries_share_a_key():
+    assert canonicalize_sql("SELECT SUM(Stock) FROM clothing_data where Brand = \"Nike\"  limit 10.0;") == \
+        canonicalize_sql("SELECT SUM(Stock) FROM clothing_data WHERE Brand='Nike' LIMIT 10")
+
+@pytest.mark.parametrize('a, b', [
+    ("SELECT SUM(Stock) FROM clothing_data", "select sum(Stock) from clothing_data"),
+    ("SELECT SUM(Stock * Price_INR) FROM clothing_data", "SELECT SUM(Stock*Price_INR) FROM clothing_data"),
+    ("SELECT (SELECT MAX(Stock) FROM clothing_data) FROM clothing_data",
+     "SELECT (SELECT MAX(Stock) from clothing_data) FROM clothing_data"),
+])
+def test_select_lists_labelled_differently_get_their_own_keys(db, a, b):
+    _, db_manager = db
+    # The database names the unaliased columns after their text
+    assert list(db_manager.execute_query(a).columns) != list(db_manager.execute_query(b).columns)
+    assert canonicalize_sql(a) != canonicalize_sql(b)
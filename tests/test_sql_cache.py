@@ -0,0 +1,56 @@
+import time
+import pytest
+from llm_handler import SQLCache
+
+NIKE_SHIRTS = "SELECT SUM(Stock) FROM clothing_data WHERE Brand = 'Nike' AND Category = 'Shirt';"
+
+@pytest.fixture
+def cache():
+    return SQLCache(':memory:', ttl=3600, max_entries=10, threshold=0.5)
+
+def test_exact_hit_ignores_case_and_punctuation(cache):
+    cache.put("How many Nike shirts?", NIKE_SHIRTS, 'number')
+    assert cache.get("how many nike SHIRTS") == (NIKE_SHIRTS, 'number')
+    assert cache.stats['exact_hits'] == 1
+
+def test_similar_hit_when_only_filler_differs(cache):
+    cache.put("how many Nike shirts", NIKE_SHIRTS, 'number')
+    assert cache.get("how many Nike shirts are there") == (NIKE_SHIRTS, 'number')
+    assert cache.stats['similar_hits'] == 1
+
+def test_stopword_values_are_not_dropped(cache):
+    cache.put("how many Nike shirts", NIKE_SHIRTS, 'number')
+    assert cache.get("how many S Nike shirts") is None
+
+def test_word_order_of_dimensions_matters(cache):
+    cache.put("top brand by color", "SELECT Brand, Color ... GROUP BY Brand", 'bar_chart')
+    assert cache.get("top color by brand") is None
+
+def test_numbers_must_match(cache):
+    cache.put("top 5 brands by stock", "SELECT ... LIMIT 5", 'bar_chart')
+    assert cache.get("show the top 10 brands by stock") is None
+
+def test_entries_expire_after_ttl():
+    cache = SQLCache(':memory:', ttl=0.05)
+    cache.put("how many Nike shirts", NIKE_SHIRTS, 'number')
+    time.sleep(0.1)
+    assert cache.get("how many Nike shirts") is None
+    assert cache.stats['misses'] == 1
+
+def test_least_recently_used_is_evicted():
+    cache = SQLCache(':memory:', max_entries=2)
+    cache.put("how many Nike shirts", NIKE_SHIRTS, 'number')
+    time.sleep(0.01)
+    cache.put("how many Puma shirts", "SELECT 2", 'number')
+    time.sleep(0.01)
+    assert cache.get("how many Nike shirts")  # now the most recently used
+    time.sleep(0.01)
+    cache.put("how many Zara shirts", "SELECT 3", 'number')
+    assert cache.get("how many Puma shirts") is None
+    assert cache.get("how many Nike shirts") == (NIKE_SHIRTS, 'number')
+    assert cache.get("how many Zara shirts") == ("SELECT 3", 'number')
+
+def test_entries_survive_a_restart(tmp_path):
+    path = str(tmp_path / 'sql_cache.db')
+    SQLCache(path).put("how many Nike shirts", NIKE_SHIRTS, 'number')
+    assert SQLCache(path, threshold=0.5).get("how many Nike shirts are there") == (NIKE_SHIRTS, 'number')
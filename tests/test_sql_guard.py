@@ -0,0 +1,54 @@
+import pytest
+from sql_guard import SQLGuard, SQLValidationError
+
+VOCABULARY = {'Brand': ['Nike', 'Puma', 'Levis'], 'Category': ['Shirt', 'T-Shirt', 'Jacket']}
+
+@pytest.fixture
+def guard():
+    return SQLGuard(max_rows=100, load_vocabulary=lambda: VOCABULARY)
+
+@pytest.mark.parametrize('sql', [
+    "SELECT LOAD_FILE('/etc/passwd')",
+    "SELECT SLEEP(100)",
+    "SELECT BENCHMARK(1000000, MD5('a'))",
+    "SELECT @@version",
+    "SELECT VERSION()",
+    "SELECT Brand FROM clothing_data WHERE SLEEP(1) = 0",
+    "SELECT * FROM clothing_data INTO OUTFILE '/tmp/x'",
+    "DELETE FROM clothing_data",
+    "SELECT 1; DROP TABLE clothing_data",
+    "SELECT * FROM users",
+    "SELECT Password FROM clothing_data",
+])
+def test_unsafe_sql_is_rejected(guard, sql):
+    with pytest.raises(SQLValidationError):
+        guard.check(sql)
+    assert guard.stats['rejected'] == 1
+
+@pytest.mark.parametrize('sql', [
+    "SELECT SUM(Stock) FROM clothing_data WHERE Brand = 'Nike'",
+    "SELECT Brand, ROUND(AVG(Price_INR), 2) as avg FROM clothing_data GROUP BY Brand ORDER BY avg DESC LIMIT 5",
+    "SELECT COUNT(DISTINCT Color) FROM clothing_data WHERE LOWER(Brand) = 'nike' AND YEAR(NOW()) > 2000",
+    "SELECT SUM(CASE WHEN Stock < 10 THEN 1 ELSE 0 END) FROM clothing_data",
+])
+def test_allowed_functions_pass_unchanged(guard, sql):
+    assert guard.check(sql) == sql
+
+def test_select_star_is_expanded_and_limited(guard):
+    assert guard.check("SELECT * FROM clothing_data WHERE Brand = 'Nike'") == (
+        "SELECT SKU, Brand, Category, Color, Size, Price_INR, Stock, Material, Gender "
+        "FROM clothing_data WHERE Brand = 'Nike' LIMIT 101")
+
+def test_leading_wildcard_like_becomes_in(guard):
+    assert guard.check("SELECT SUM(Stock) FROM clothing_data WHERE Category LIKE '%shirt%'") == (
+        "SELECT SUM(Stock) FROM clothing_data WHERE Category IN ('Shirt', 'T-Shirt')")
+    assert guard.check("SELECT SUM(Stock) FROM clothing_data WHERE Category NOT LIKE '%shirt'") == (
+        "SELECT SUM(Stock) FROM clothing_data WHERE NOT Category IN ('Shirt', 'T-Shirt')")
+    # Trailing-only wildcards can use an index and are left alone
+    sql = "SELECT SUM(Stock) FROM clothing_data WHERE Brand LIKE 'Ni%'"
+    assert guard.check(sql) == sql
+
+def test_limit_is_added_and_clamped(guard):
+    assert guard.check("SELECT Brand, Stock FROM clothing_data") == "SELECT Brand, Stock FROM clothing_data LIMIT 101"
+    assert guard.check("SELECT Brand FROM clothing_data LIMIT 5000") == "SELECT Brand FROM clothing_data LIMIT 101"
+    assert guard.check("SELECT Brand FROM clothing_data LIMIT 10") == "SELECT Brand FROM clothing_data LIMIT 10"
@@ -0,0 +1,28 @@
+from decimal import Decimal
+import numpy as np
+import pandas as pd
+from visualization import OTHER, choose_chart, numeric_columns, top_n_other
+
+def test_repeated_labels_stay_a_table():
+    # SELECT Brand, Price_INR FROM clothing_data: one row per item, not per brand
+    rows = pd.DataFrame({'Brand': ['Nike', 'Puma'] * 250, 'Price_INR': np.arange(500)})
+    assert choose_chart(rows) == 'table'
+    assert choose_chart(rows, 'bar_chart') == 'table'
+
+def test_table_hint_is_kept():
+    rows = pd.DataFrame({'Brand': ['Nike', 'Puma', 'Zara'], 'Price_INR': [100, 200, 300]})
+    assert choose_chart(rows, 'table') == 'table'
+    assert choose_chart(rows, 'bar_chart') == 'bar_chart'
+    assert choose_chart(rows, 'pie_chart') == 'pie_chart'
+
+def test_grouped_result_is_charted():
+    grouped = numeric_columns(pd.DataFrame({'Brand': ['Nike', 'Puma'], 'total': [Decimal(5), Decimal(7)]}))
+    assert choose_chart(grouped, 'bar_chart') == 'bar_chart'
+    assert choose_chart(pd.DataFrame({'total': [Decimal(12)]}), 'number') == 'number'
+
+def test_top_n_other_folds_the_tail():
+    grouped = pd.DataFrame({'Brand': list('abcdef'), 'total': [1, 6, 2, 5, 3, 4]})
+    folded = top_n_other(grouped, 'Brand', 'total', n=3)
+    assert folded['Brand'].tolist() == ['b', 'd', OTHER]
+    assert folded['total'].tolist() == [6, 5, 10]
+    assert top_n_other(grouped, 'Brand', 'total', n=6).equals(grouped)
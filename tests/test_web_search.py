@@ -0,0 +1,87 @@
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+import web_search
+from benchmarks.stubs import start_serper_stub
+from web_search import CircuitBreaker, WebSearch, WebSearchCache
+
+@pytest.fixture
+def serper():
+    server = start_serper_stub(latency=0.2)
+    yield server
+    server.shutdown()
+
+def client(server, **kwargs):
+    return WebSearch(f"http://127.0.0.1:{server.server_port}/search", 'test', timeout=2.0, **kwargs)
+
+def test_identical_concurrent_queries_share_one_request(serper):
+    search = client(serper)
+    answers = []
+    threads = [threading.Thread(target=lambda: answers.append(search.search("Who founded Nike?"))) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert serper.requests == 1
+    assert search.stats['misses'] == 1 and search.stats['coalesced'] == 4
+    assert len(set(answers)) == 1 and "Result for Who founded Nike?" in answers[0]
+
+def test_breaker_opens_then_half_opens_and_closes(serper):
+    search = client(serper, breaker=CircuitBreaker(threshold=2, reset_timeout=0.3))
+    serper.status = 500
+    assert search.search("one").startswith("Web search failed")
+    assert search.search("two").startswith("Web search failed")
+    assert search.breaker.state == 'open'
+
+    # Open: refused without a request
+    assert "temporarily unavailable" in search.search("three")
+    assert serper.requests == 2 and search.stats['rejected'] == 1
+
+    time.sleep(0.35)
+    assert search.breaker.state == 'half_open'
+    serper.status = 200
+    assert "Result for four" in search.search("four")
+    assert search.breaker.state == 'closed'
+
+def test_failed_trial_reopens_the_breaker(monkeypatch):
+    now = [0.0]
+    monkeypatch.setattr(web_search, 'time', SimpleNamespace(monotonic=lambda: now[0]))
+    breaker = CircuitBreaker(threshold=1, reset_timeout=10)
+    breaker.record_failure()
+    assert not breaker.allow()
+
+    now[0] = 10
+    assert breaker.allow()
+    assert not breaker.allow()  # one trial at a time
+    breaker.record_failure()
+    assert breaker.state == 'open'
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(web_search, 'time', SimpleNamespace(time=lambda: now[0]))
+    return now
+
+def test_cache_entries_expire_after_ttl(clock):
+    cache = WebSearchCache(':memory:', ttl=60, max_entries=10)
+    cache.put('who founded nike', 'Phil Knight')
+    clock[0] += 59
+    assert cache.get('who founded nike') == 'Phil Knight'
+    clock[0] += 2
+    assert cache.get('who founded nike') is None
+
+def test_cache_evicts_least_recently_used(clock):
+    cache = WebSearchCache(':memory:', ttl=3600, max_entries=2)
+    cache.put('a', 'A')
+    clock[0] += 1
+    cache.put('b', 'B')
+    clock[0] += 1
+    assert cache.get('a') == 'A'
+    clock[0] += 1
+    cache.put('c', 'C')
+
+    assert cache.get('b') is None
+    assert cache.get('a') == 'A' and cache.get('c') == 'C'
@@ -0,0 +1,134 @@
+"""
+Embedding-based retrieval of few-shot examples over a memory-mapped .npy store
+"""
+
+import hashlib
+import json
+import os
+import re
+import zlib
+import numpy as np
+from example_index import normalize_question
+
+class HashedEmbedder:
+    """Hashed character n-gram embedding, needs no model download"""
+
+    def __init__(self, dim=384, ngram_sizes=(3, 4)):
+        self.dim = dim
+        self.ngram_sizes = ngram_sizes
+        self.name = f"hashed{dim}"
+
+    def _vector(self, text):
+        vector = np.zeros(self.dim, dtype=np.float32)
+        for word in normalize_question(text).split():
+            padded = f" {word} "
+            for n in self.ngram_sizes:
+                for i in range(max(1, len(padded) - n + 1)):
+                    h = zlib.crc32(padded[i:i + n].encode())
+                    # Signed hashing keeps collisions from only ever adding up
+                    vector[h % self.dim] += 1.0 if h & 0x80000000 else -1.0
+        return vector
+
+    def embed(self, texts):
+        if not texts:
+            return np.zeros((0, self.dim), dtype=np.float32)
+        matrix = np.stack([self._vector(text) for text in texts])
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        return matrix / np.maximum(norms, 1e-12)
+
+class SentenceTransformerEmbedder:
+    """Small CPU sentence-transformers model, loaded on first use"""
+
+    def __init__(self, model_name):
+        self.model_name = model_name
+        self.name = re.sub(r"[^A-Za-z0-9]+", "-", model_name)
+        self._model = None
+
+    def embed(self, texts):
+        if self._model is None:
+            from sentence_transformers import SentenceTransformer
+            self._model = SentenceTransformer(self.model_name, device='cpu')
+        return self._model.encode(
+            list(texts), batch_size=64, normalize_embeddings=True, convert_to_numpy=True
+        ).astype(np.float32)
+
+def get_embedder(model_name):
+    """Pick an embedder, falling back to hashed n-grams if the model can't load"""
+    if model_name and model_name != 'hashed':
+        try:
+            import sentence_transformers  # noqa: F401
+            return SentenceTransformerEmbedder(model_name)
+        except ImportError:
+            pass
+    return HashedEmbedder()
+
+def example_key(example):
+    return hashlib.sha1(example['Question'].encode()).hexdigest()
+
+class VectorStore:
+    """Few-shot examples with their embeddings kept in a memory-mapped .npy file.
+
+    A ``<path>.keys.json`` sidecar lists which example each row belongs to, so
+    only examples missing from it are embedded when the bank changes.
+    """
+
+    def __init__(self, examples, embedder, path):
+        self.examples = list(examples)
+        self.embedder = embedder
+        self.path = f"{path}_{embedder.name}.npy"
+        self.keys_path = self.path + '.keys.json'
+        self.matrix = self._load_or_build()
+
+    def _load_or_build(self):
+        wanted = [example_key(example) for example in self.examples]
+        if not wanted:
+            return np.zeros((0, 1), dtype=np.float32)
+
+        stored_keys, stored = [], None
+        if os.path.exists(self.path) and os.path.exists(self.keys_path):
+            with open(self.keys_path) as f:
+                stored_keys = json.load(f)
+            stored = np.load(self.path, mmap_mode='r')
+            if stored.shape[0] != len(stored_keys):
+                stored_keys, stored = [], None
+
+        if stored_keys == wanted:
+            return stored
+
+        # Embed only the examples that aren't in the file yet
+        rows = {key: i for i, key in enumerate(stored_keys)}
+        missing = [i for i, key in enumerate(wanted) if key not in rows]
+        fresh = self.embedder.embed([self.examples[i]['Question'] for i in missing])
+        fresh_rows = {wanted[i]: row for row, i in enumerate(missing)}
+
+        dim = fresh.shape[1] if len(missing) else stored.shape[1]
+        matrix = np.empty((len(wanted), dim), dtype=np.float32)
+        for i, key in enumerate(wanted):
+            matrix[i] = fresh[fresh_rows[key]] if key in fresh_rows else stored[rows[key]]
+        del stored
+
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        tmp_path = self.path + '.tmp.npy'
+        np.save(tmp_path, matrix)
+        os.replace(tmp_path, self.path)
+        with open(self.keys_path, 'w') as f:
+            json.dump(wanted, f)
+        return np.load(self.path, mmap_mode='r')
+
+    def search_batch(self, questions, top_k: int = 3):
+        """Cosine top_k for several questions with one matrix product"""
+        if top_k <= 0 or not self.examples or not questions:
+            return [[] for _ in questions]
+        scores = self.embedder.embed(questions) @ self.matrix.T
+
+        k = min(top_k, scores.shape[1])
+        top = np.argpartition(scores, -k, axis=1)[:, -k:]
+        results = []
+        for row, candidates in zip(scores, top):
+            ranked = candidates[np.argsort(-row[candidates], kind='stable')]
+            results.append([self.examples[i] for i in ranked if row[i] > 0])
+        return results
+
+    def search(self, question: str, top_k: int = 3):
+        """Return the top_k most similar examples, best first"""
+        return self.search_batch([question], top_k)[0]
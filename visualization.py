@@ -0,0 +1,188 @@
+"""
+Chart rendering for query results: picks the chart from the result's shape and
+dtypes, shrinks the data in pandas/NumPy before plotting, and memoizes figures
+"""
+
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from decimal import Decimal
+import numpy as np
+import pandas as pd
+import streamlit as st
+from metrics import metrics
+
+MAX_CATEGORIES = 20      # bars before the tail is folded into "Other"
+MAX_PIE_SLICES = 8
+HISTOGRAM_BINS = 30
+MAX_POINTS = 20000       # scatter points sent to the browser
+WEBGL_THRESHOLD = 1000   # switch scatters to WebGL above this many points
+OTHER = "Other"
+
+def show_number(value):
+    col1, col2, col3 = st.columns([1, 2, 1])
+    with col2:
+        st.metric(label="Result", value=f"{value:,.0f}" if isinstance(value, (int, float, Decimal)) else value)
+
+def numeric_columns(df):
+    """Copy of ``df`` with Decimal/number object columns (MySQL SUMs) made numeric"""
+    converted = {}
+    for column in df.columns:
+        series = df[column]
+        if series.dtype == object:
+            sample = series.dropna()
+            if len(sample) and isinstance(sample.iloc[0], (Decimal, int, float)) and not isinstance(sample.iloc[0], bool):
+                converted[column] = pd.to_numeric(series, errors='coerce')
+    return df.assign(**converted) if converted else df
+
+def is_measure(series):
+    return pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series)
+
+def choose_chart(df, hint=None):
+    """Chart kind for a result: number, bar_chart, pie_chart, histogram, scatter or table.
+
+    ``hint`` is the viz_type suggested for the question. A 'table' hint (no
+    GROUP BY) keeps label/value rows as a table, as does a label repeated
+    across rows, since drawing them would mean summing unrelated rows.
+    Otherwise the hint only decides between a pie and a bar.
+    """
+    if df is None or df.empty:
+        return None
+    if df.shape == (1, 1):
+        return 'number'
+    if len(df) == 1:
+        return 'table'
+
+    measures = [column for column in df.columns if is_measure(df[column])]
+    dimensions = [column for column in df.columns if column not in measures]
+
+    if len(dimensions) == 1 and measures:
+        if hint == 'table' or not df[dimensions[0]].is_unique:
+            return 'table'
+        if hint == 'pie_chart' and (df[measures[0]].dropna() >= 0).all() and df[dimensions[0]].nunique() <= MAX_PIE_SLICES:
+            return 'pie_chart'
+        return 'bar_chart'
+    if not dimensions and len(measures) == 1:
+        return 'histogram'
+    if not dimensions and len(measures) >= 2:
+        return 'scatter'
+    return 'table'
+
+def top_n_other(df, dimension, measure, n=MAX_CATEGORIES):
+    """Keep the ``n`` largest rows and sum the rest into "Other".
+
+    Expects one row per ``dimension`` value (see choose_chart). Results that
+    already fit are returned as they are, in their SQL order.
+    """
+    if len(df) <= n:
+        return df[[dimension, measure]]
+    values = df[measure].to_numpy(dtype=float)
+    order = np.argsort(-np.abs(values), kind='stable')
+    labels = df[dimension].iloc[order[:n - 1]].astype(str).tolist() + [OTHER]
+    return pd.DataFrame({dimension: labels, measure: np.append(values[order[:n - 1]], values[order[n - 1:]].sum())})
+
+def bin_numeric(series, bins=HISTOGRAM_BINS):
+    """Counts per equal-width bin, labelled by range"""
+    values = series.dropna().to_numpy(dtype=float)
+    counts, edges = np.histogram(values, bins=min(bins, max(1, len(np.unique(values)))))
+    labels = [f"{lo:,.0f}–{hi:,.0f}" for lo, hi in zip(edges[:-1], edges[1:])]
+    return pd.DataFrame({series.name: labels, 'count': counts})
+
+def build_figure(df, kind):
+    """Plotly figure for ``kind`` from a result already reduced to what will be drawn"""
+    # plotly takes a while to import; only pay for it once a chart is drawn
+    import plotly.express as px
+
+    measures = [column for column in df.columns if is_measure(df[column])]
+    dimensions = [column for column in df.columns if column not in measures]
+
+    if kind in ('bar_chart', 'pie_chart'):
+        data = top_n_other(df, dimensions[0], measures[0], MAX_PIE_SLICES if kind == 'pie_chart' else MAX_CATEGORIES)
+        if kind == 'pie_chart':
+            return px.pie(data, names=dimensions[0], values=measures[0], title="Distribution")
+        fig = px.bar(data, x=dimensions[0], y=measures[0], title="Distribution",
+                     color=measures[0], color_continuous_scale='Blues')
+        fig.update_layout(showlegend=False)
+        fig.update_xaxes(type='category')
+        return fig
+
+    if kind == 'histogram':
+        data = bin_numeric(df[measures[0]])
+        fig = px.bar(data, x=measures[0], y='count', title="Distribution")
+        fig.update_xaxes(type='category')
+        return fig
+
+    if kind == 'scatter':
+        data = df[measures[:2]]
+        if len(data) > MAX_POINTS:
+            data = data.sample(n=MAX_POINTS, random_state=0)
+        return px.scatter(data, x=measures[0], y=measures[1],
+                          render_mode='webgl' if len(data) > WEBGL_THRESHOLD else 'auto')
+    return None
+
+def result_key(df, kind):
+    """Content hash of a result, for reusing its figure"""
+    digest = hashlib.sha1(kind.encode())
+    digest.update(json.dumps([str(column) for column in df.columns]).encode())
+    digest.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+    return digest.hexdigest()
+
+class FigureCache:
+    """LRU of serialized figures keyed by result hash"""
+
+    def __init__(self, max_entries=128):
+        self.max_entries = max_entries
+        self._figures = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0}
+
+    def get_or_build(self, df, kind):
+        try:
+            key = result_key(df, kind)
+        except TypeError:
+            return _to_json(build_figure(df, kind))  # unhashable cells; just draw it
+        with self._lock:
+            figure = self._figures.get(key)
+            if figure is not None:
+                self._figures.move_to_end(key)
+                self.stats['hits'] += 1
+                return figure
+            self.stats['misses'] += 1
+        figure = _to_json(build_figure(df, kind))
+        with self._lock:
+            self._figures[key] = figure
+            while len(self._figures) > self.max_entries:
+                self._figures.popitem(last=False)
+        return figure
+
+def _to_json(fig):
+    return fig.to_json() if fig is not None else None
+
+figure_cache = FigureCache()
+
+@metrics.traced('create_visualization')
+def create_visualization(df, viz_type=None):
+    """Draw the chart for a result; returns the figure as JSON so history can redraw it"""
+    if df is None or df.empty:
+        st.warning("No data to visualize")
+        return None
+
+    try:
+        df = numeric_columns(df)
+        kind = choose_chart(df, viz_type)
+        if kind == 'number':
+            show_number(df.iloc[0, 0])
+            return None
+        # Tables are already on screen as the result preview
+        if kind == 'table':
+            return None
+
+        figure = figure_cache.get_or_build(df, kind)
+        if figure is not None:
+            st.plotly_chart(json.loads(figure), use_container_width=True)
+        return figure
+
+    except Exception as e:
+        st.error(f"Visualization error: {e}")
+        return None
@@ -1,29 +1,234 @@
-import requests
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future
 from config import config
+from example_index import normalize_question
+from metrics import metrics
 import streamlit as st
 
+class CircuitBreaker:
+    """Fails fast after ``threshold`` consecutive failures.
+
+    Once open, calls are refused for ``reset_timeout`` seconds; then a single
+    trial call is let through, closing the breaker again if it succeeds.
+    """
+
+    def __init__(self, threshold=5, reset_timeout=30.0):
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self._trial = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return 'closed'
+        return 'half_open' if time.monotonic() - self.opened_at >= self.reset_timeout else 'open'
+
+    def allow(self):
+        with self._lock:
+            state = self.state
+            if state == 'closed':
+                return True
+            if state == 'half_open' and not self._trial:
+                self._trial = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self._trial or self.failures >= self.threshold:
+                self.opened_at = time.monotonic()
+            self._trial = False
+
+class WebSearchCache:
+    """Query -> formatted answer, persisted to SQLite with a TTL and LRU eviction"""
+
+    def __init__(self, path, ttl=21600, max_entries=500):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        if path != ':memory:':
+            os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS web_cache (
+                query TEXT PRIMARY KEY,
+                answer TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                last_used REAL NOT NULL
+            )
+        """)
+        self._conn.commit()
+
+    def get(self, key):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT answer FROM web_cache WHERE query = ? AND created_at >= ?", (key, time.time() - self.ttl)
+            ).fetchone()
+            if row:
+                self._conn.execute("UPDATE web_cache SET last_used = ? WHERE query = ?", (time.time(), key))
+                self._conn.commit()
+            return row[0] if row else None
+
+    def put(self, key, answer):
+        if self.max_entries <= 0:
+            return
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO web_cache VALUES (?, ?, ?, ?)", (key, answer, now, now)
+            )
+            self._conn.execute("DELETE FROM web_cache WHERE created_at < ?", (now - self.ttl,))
+            self._conn.execute("""
+                DELETE FROM web_cache WHERE query NOT IN (
+                    SELECT query FROM web_cache ORDER BY last_used DESC LIMIT ?
+                )
+            """, (self.max_entries,))
+            self._conn.commit()
+
+def format_results(results, max_results=3):
+    """Markdown answer from a Serper response: the answer box if any, then the top organic hits"""
+    parts = []
+    answer_box = results.get('answerBox') or {}
+    if answer_box.get('answer') or answer_box.get('snippet'):
+        parts.append(f"**{answer_box.get('answer') or answer_box.get('snippet')}**")
+    for result in (results.get('organic') or [])[:max_results]:
+        parts.append(f"**{result.get('title', '')}**\n\n{result.get('snippet', '')}\n\nSource: {result.get('link', '')}")
+    return "\n\n---\n\n".join(parts) if parts else "No relevant results found."
+
+class WebSearch:
+    """Serper client with a pooled keep-alive session, strict timeouts, a
+    persistent TTL cache, coalescing of identical in-flight queries and a
+    circuit breaker. Every outcome is counted in ``stats`` and metrics.
+    """
+
+    def __init__(self, url, api_key, timeout=5.0, cache=None, breaker=None, pool_size=10):
+        self.url = url
+        self.api_key = api_key
+        # (connect, read) seconds
+        self.timeout = (min(timeout, 3.05), timeout)
+        self.cache = cache
+        self.breaker = breaker or CircuitBreaker()
+        self.pool_size = pool_size
+        self._session = None
+        self._lock = threading.Lock()
+        self._in_flight = {}
+        self.stats = {'hits': 0, 'misses': 0, 'coalesced': 0, 'errors': 0, 'rejected': 0, 'fetched': 0, 'fetch_s': 0.0}
+
+    def _count(self, outcome, value=1):
+        with self._lock:
+            self.stats[outcome] += value
+        metrics.inc('web_search_total', value, outcome=outcome)
+
+    def session(self):
+        """Shared keep-alive session, created on first use"""
+        with self._lock:
+            if self._session is None:
+                import requests
+                from requests.adapters import HTTPAdapter
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size, max_retries=0)
+                session.mount('http://', adapter)
+                session.mount('https://', adapter)
+                session.headers.update({'X-API-KEY': self.api_key, 'Content-Type': 'application/json'})
+                self._session = session
+            return self._session
+
+    def _fetch(self, query):
+        if not self.breaker.allow():
+            self._count('rejected')
+            return "Web search is temporarily unavailable. Please try again shortly."
+        start = time.perf_counter()
+        try:
+            response = self.session().post(self.url, json={"q": query}, timeout=self.timeout)
+            response.raise_for_status()
+            answer = format_results(response.json())
+        except Exception as e:
+            self.breaker.record_failure()
+            self._count('errors')
+            return f"Web search failed: {e}"
+        finally:
+            metrics.observe('web_search_request', time.perf_counter() - start)
+        self.breaker.record_success()
+        with self._lock:
+            self.stats['fetched'] += 1
+            self.stats['fetch_s'] += time.perf_counter() - start
+        if self.cache is not None:
+            self.cache.put(normalize_question(query), answer)
+        return answer
+
+    def search(self, query: str):
+        key = normalize_question(query)
+        if self.cache is not None:
+            cached = self.cache.get(key)
+            if cached is not None:
+                self._count('hits')
+                return cached
+
+        # One request per distinct query; concurrent askers wait for it
+        with self._lock:
+            future = self._in_flight.get(key)
+            leader = future is None
+            if leader:
+                future = self._in_flight[key] = Future()
+        if not leader:
+            self._count('coalesced')
+            return future.result()
+
+        self._count('misses')
+        try:
+            answer = self._fetch(query)
+            future.set_result(answer)
+            return answer
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._in_flight.pop(key, None)
+
+    def hit_rate(self):
+        served = self.stats['hits'] + self.stats['coalesced']
+        total = served + self.stats['misses']
+        return served / total if total else 0.0
+
+    def metrics(self):
+        fetched = self.stats['fetched']
+        return {
+            **self.stats,
+            'hit_rate': round(self.hit_rate(), 3),
+            'avg_fetch_ms': round(self.stats['fetch_s'] / fetched * 1000, 1) if fetched else 0.0,
+            'breaker': self.breaker.state,
+        }
+
+@st.cache_resource
+def get_web_search():
+    """Process-wide WebSearch, so the session, breaker and cache survive reruns"""
+    return WebSearch(
+        config.SERPER_URL,
+        config.get('SERPER_API_KEY'),
+        timeout=config.WEB_SEARCH_TIMEOUT,
+        cache=WebSearchCache(config.WEB_CACHE_PATH, config.WEB_CACHE_TTL, config.WEB_CACHE_MAX_ENTRIES),
+        breaker=CircuitBreaker(config.WEB_BREAKER_THRESHOLD, config.WEB_BREAKER_RESET)
+    )
+
+@metrics.traced('web_search_fallback')
 def web_search_fallback(query):
     """Fallback to web search if query is not database-related"""
-    
+
     if not config.get('SERPER_API_KEY'):
         return "Web search is not configured. Please set SERPER_API_KEY."
-    
-    try:
-        url = "https://google.serper.dev/search"
-        payload = {"q": query}
-        headers = {
-            'X-API-KEY': config.get('SERPER_API_KEY'),
-            'Content-Type': 'application/json'
-        }
-        
-        response = requests.post(url, json=payload, headers=headers)
-        results = response.json()
-        
-        if 'organic' in results and len(results['organic']) > 0:
-            top_result = results['organic'][0]
-            return f"**{top_result['title']}**\n\n{top_result['snippet']}\n\nSource: {top_result['link']}"
-        
-        return "No relevant results found."
-        
-    except Exception as e:
-        return f"Web search failed: {e}"
+
+    return get_web_search().search(query)